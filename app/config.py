@@ -15,9 +15,37 @@ class Settings:
     SEND_RETRY_MAX: int
     SEND_RETRY_DELAY_MS: int
     SEND_MIN_DELAY_MS: int
+    TEST_SEND_MAX_TARGETS: int
     SEND_JITTER_PCT: float
     GROUP_CACHE_TTL_SECONDS: int
     GROUP_CACHE_ENABLED: int
+    GROUP_MEMBER_COUNT_ENABLED: int
+    MEMBER_COUNT_TTL_S: int
+    MEMBER_COUNT_CONCURRENCY: int
+    TASK_FLUSH_EVERY: int
+    TASK_FLUSH_INTERVAL_MS: int
+    SCHEDULER_WORKERS: int
+    SCHEDULER_MAX_QUEUE: int
+    SCHEDULER_SLICE_SENDS: int
+    ACCOUNT_SEND_RATE_PER_MIN: float
+    ACCOUNT_SEND_BURST: int
+    FLOOD_WAIT_INLINE_MAX_S: int
+    MEDIA_DIR: str
+    MEDIA_MAX_BYTES: int
+    ACCOUNT_STATUS_TTL_S: int
+    ACCOUNT_STATUS_CONCURRENCY: int
+    ACCOUNT_STATUS_TIMEOUT_S: float
+    CLIENT_POOL_MAX: int
+    CLIENT_IDLE_S: int
+    SEND_ONLY: int
+    SESSION_STORE: str
+    GROUP_FULL_SYNC_S: int
+    GROUP_RECONCILE_S: int
+    SESSION_FLUSH_INTERVAL_MS: int
+    CONNECT_BACKOFF_MAX_S: int
+    CONNECT_WAIT_S: int
+    STARTUP_RESUME_BATCH: int
+    STARTUP_RESUME_STAGGER_S: float
 
     def __init__(self):
         admin_token = os.getenv("ADMIN_TOKEN") or os.getenv("ADMIN_PASSWORD")
@@ -33,12 +61,49 @@ class Settings:
         self.SEND_RETRY_MAX = int(os.getenv("SEND_RETRY_MAX", "2"))
         self.SEND_RETRY_DELAY_MS = int(os.getenv("SEND_RETRY_DELAY_MS", "1500"))
         self.SEND_MIN_DELAY_MS = int(os.getenv("SEND_MIN_DELAY_MS", "1500"))
+        self.TEST_SEND_MAX_TARGETS = int(os.getenv("TEST_SEND_MAX_TARGETS", "10"))
         try:
             self.SEND_JITTER_PCT = float(os.getenv("SEND_JITTER_PCT", "0.15"))
         except Exception:
             self.SEND_JITTER_PCT = 0.15
         self.GROUP_CACHE_TTL_SECONDS = int(os.getenv("GROUP_CACHE_TTL_SECONDS", "600"))
         self.GROUP_CACHE_ENABLED = int(os.getenv("GROUP_CACHE_ENABLED", "1"))
+        self.GROUP_MEMBER_COUNT_ENABLED = int(os.getenv("GROUP_MEMBER_COUNT_ENABLED", "0"))
+        self.MEMBER_COUNT_TTL_S = int(os.getenv("MEMBER_COUNT_TTL_S", "86400"))
+        self.MEMBER_COUNT_CONCURRENCY = int(os.getenv("MEMBER_COUNT_CONCURRENCY", "4"))
+        self.TASK_FLUSH_EVERY = int(os.getenv("TASK_FLUSH_EVERY", "20"))
+        self.TASK_FLUSH_INTERVAL_MS = int(os.getenv("TASK_FLUSH_INTERVAL_MS", "5000"))
+        self.SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+        self.SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))
+        self.SCHEDULER_SLICE_SENDS = int(os.getenv("SCHEDULER_SLICE_SENDS", "50"))
+        try:
+            self.ACCOUNT_SEND_RATE_PER_MIN = float(os.getenv("ACCOUNT_SEND_RATE_PER_MIN", "40"))
+        except Exception:
+            self.ACCOUNT_SEND_RATE_PER_MIN = 40.0
+        self.ACCOUNT_SEND_BURST = int(os.getenv("ACCOUNT_SEND_BURST", "5"))
+        self.FLOOD_WAIT_INLINE_MAX_S = int(os.getenv("FLOOD_WAIT_INLINE_MAX_S", "60"))
+        self.MEDIA_DIR = os.getenv("MEDIA_DIR", "./data/media")
+        self.MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(50 * 1024 * 1024)))
+        self.ACCOUNT_STATUS_TTL_S = int(os.getenv("ACCOUNT_STATUS_TTL_S", "60"))
+        self.ACCOUNT_STATUS_CONCURRENCY = int(os.getenv("ACCOUNT_STATUS_CONCURRENCY", "5"))
+        try:
+            self.ACCOUNT_STATUS_TIMEOUT_S = float(os.getenv("ACCOUNT_STATUS_TIMEOUT_S", "8"))
+        except Exception:
+            self.ACCOUNT_STATUS_TIMEOUT_S = 8.0
+        self.CLIENT_POOL_MAX = int(os.getenv("CLIENT_POOL_MAX", "10"))
+        self.CLIENT_IDLE_S = int(os.getenv("CLIENT_IDLE_S", "900"))
+        self.SEND_ONLY = int(os.getenv("TG_SEND_ONLY", "0"))
+        self.SESSION_STORE = os.getenv("SESSION_STORE", "file")
+        self.GROUP_FULL_SYNC_S = int(os.getenv("GROUP_FULL_SYNC_S", "86400"))
+        self.GROUP_RECONCILE_S = int(os.getenv("GROUP_RECONCILE_S", "1800"))
+        self.SESSION_FLUSH_INTERVAL_MS = int(os.getenv("SESSION_FLUSH_INTERVAL_MS", "1000"))
+        self.CONNECT_BACKOFF_MAX_S = int(os.getenv("CONNECT_BACKOFF_MAX_S", "60"))
+        self.CONNECT_WAIT_S = int(os.getenv("CONNECT_WAIT_S", "30"))
+        self.STARTUP_RESUME_BATCH = int(os.getenv("STARTUP_RESUME_BATCH", "5"))
+        try:
+            self.STARTUP_RESUME_STAGGER_S = float(os.getenv("STARTUP_RESUME_STAGGER_S", "3"))
+        except Exception:
+            self.STARTUP_RESUME_STAGGER_S = 3.0
         try:
             self.ACCOUNT_COUNT = int(os.getenv("ACCOUNT_COUNT", "20"))
         except Exception:
@@ -59,6 +124,7 @@ class Settings:
                     "api_id": int(api_id),
                     "api_hash": api_hash,
                     "session_name": session_name,
+                    "send_only": bool(int(os.getenv(f"TG_{name}_SEND_ONLY") or self.SEND_ONLY)),
                 }
             self.DEFAULT_ACCOUNT = names[0]
         else:
@@ -71,6 +137,7 @@ class Settings:
                 "api_id": int(api_id),
                 "api_hash": api_hash,
                 "session_name": session_name,
+                "send_only": bool(self.SEND_ONLY),
             }
             self.DEFAULT_ACCOUNT = session_name
 
@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text
+from sqlalchemy import Column, Integer, String, DateTime, Text, LargeBinary, Index
 from sqlalchemy.sql import func
 from app.database import Base
 
 
 class SendLog(Base):
     __tablename__ = "send_logs"
+    __table_args__ = (
+        Index("ix_send_logs_task_id_status", "task_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String(64), nullable=True)
     account_name = Column(String(64), index=True)
     group_id = Column(Integer, index=True)
     group_title = Column(String(255))
@@ -15,6 +19,9 @@ class SendLog(Base):
     error = Column(Text, nullable=True)
     message_id = Column(Integer, nullable=True)
     parse_mode = Column(String(16), nullable=True)
+    # "edited"/"deleted" once a bulk task changed the sent message; status
+    # keeps the result of the send itself
+    followup = Column(String(16), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -25,11 +32,16 @@ class GroupCache(Base):
     account_name = Column(String(64), index=True)
     only_groups = Column(Integer)
     data_json = Column(Text)
+    sync_json = Column(Text, nullable=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_started_at_id", "started_at", "id"),
+        Index("ix_tasks_account_started_at_id", "account_name", "started_at", "id"),
+    )
 
     id = Column(String(64), primary_key=True, index=True)
     status = Column(String(32), index=True)
@@ -43,6 +55,13 @@ class Task(Base):
     delay_ms = Column(Integer)
     current_index = Column(Integer)
     group_ids_json = Column(Text)
+    targets_blob = Column(LargeBinary, nullable=True)
+    media_json = Column(Text, nullable=True)
+    preview_state = Column(String(16), nullable=True)
+    preview_url = Column(Text, nullable=True)
+    native_schedule = Column(Integer, default=0)
+    kind = Column(String(16), default="send")
+    source_task_id = Column(String(64), nullable=True)
     request_id = Column(String(128), nullable=True)
     paused = Column(Integer, default=0)
     stop_requested = Column(Integer, default=0)
@@ -55,6 +74,29 @@ class Task(Base):
     next_round_at = Column(DateTime(timezone=True), nullable=True)
 
 
+class TaskRound(Base):
+    __tablename__ = "task_rounds"
+
+    task_id = Column(String(64), primary_key=True)
+    round = Column(Integer, primary_key=True)
+    bitmap = Column(LargeBinary)
+    done = Column(Integer, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class TaskSummary(Base):
+    __tablename__ = "task_summaries"
+
+    task_id = Column(String(64), primary_key=True)
+    sends = Column(Integer, default=0)
+    success = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    first_send_at = Column(DateTime(timezone=True), nullable=True)
+    last_send_at = Column(DateTime(timezone=True), nullable=True)
+    failure_reasons_json = Column(Text, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+
 class TaskEvent(Base):
     __tablename__ = "task_events"
 
@@ -63,4 +105,81 @@ class TaskEvent(Base):
     ts = Column(DateTime(timezone=True), server_default=func.now())
     event = Column(String(32))
     detail = Column(Text)
-    meta_json = Column(Text)
\ No newline at end of file
+    meta_json = Column(Text)
+
+
+class AccountLimit(Base):
+    __tablename__ = "account_limits"
+
+    account_name = Column(String(64), primary_key=True)
+    blocked_until = Column(DateTime(timezone=True), nullable=True)
+    flood_wait_s = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class Peer(Base):
+    __tablename__ = "peers"
+
+    account_name = Column(String(64), primary_key=True)
+    peer_id = Column(Integer, primary_key=True)
+    peer_type = Column(String(16))
+    access_hash = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class MemberCount(Base):
+    __tablename__ = "member_counts"
+
+    chat_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=True)
+    updated_at = Column(DateTime(timezone=True))
+
+
+class MediaFile(Base):
+    __tablename__ = "media_files"
+
+    id = Column(String(64), primary_key=True)
+    filename = Column(String(255))
+    mime_type = Column(String(128))
+    size = Column(Integer)
+    path = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class ScheduledMessage(Base):
+    __tablename__ = "scheduled_messages"
+
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(String(64), index=True)
+    account_name = Column(String(64))
+    group_id = Column(Integer)
+    round = Column(Integer)
+    message_id = Column(Integer, nullable=True)
+    schedule_at = Column(DateTime(timezone=True))
+    status = Column(String(16))
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TgSession(Base):
+    __tablename__ = "tg_sessions"
+
+    session_name = Column(String(128), primary_key=True)
+    dc_id = Column(Integer)
+    server_address = Column(String(64), nullable=True)
+    port = Column(Integer, nullable=True)
+    auth_key = Column(LargeBinary, nullable=True)
+    takeout_id = Column(Integer, nullable=True)
+    update_states = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class TgEntity(Base):
+    __tablename__ = "tg_entities"
+
+    session_name = Column(String(128), primary_key=True)
+    id = Column(Integer, primary_key=True)
+    hash = Column(Integer)
+    username = Column(String(64), nullable=True)
+    phone = Column(String(32), nullable=True)
+    name = Column(Text, nullable=True)
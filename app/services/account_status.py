@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+from typing import Optional
+from app.config import CONFIG
+from app.telegram_client import MultiTelegramManager, multi_manager, add_auth_listener
+
+
+def _has_session(account: str) -> bool:
+    cfg = CONFIG.ACCOUNTS.get(account) or {}
+    session_name = cfg.get("session_name") or account
+    if os.path.isfile(os.path.join(CONFIG.SESSION_DIR, session_name + ".session")):
+        return True
+    if getattr(CONFIG, "SESSION_STORE", "file") == "db":
+        from app.services.session_store import has_session
+        return has_session(session_name)
+    return False
+
+
+# Authorization state per account, checked concurrently (bounded by a
+# semaphore, each check with a timeout) and cached for ttl_s. A stale entry
+# is still served while a background check refreshes it; auth errors seen
+# by the client drop the entry immediately.
+class AccountStatusService:
+    def __init__(self, manager: MultiTelegramManager, ttl_s: int, concurrency: int, timeout_s: float):
+        self.manager = manager
+        self.ttl_s = max(1, ttl_s)
+        self.timeout_s = max(1.0, timeout_s)
+        self._sem = asyncio.Semaphore(max(1, concurrency))
+        self._cache: dict[str, dict] = {}
+        self._checks: dict[str, asyncio.Task] = {}
+
+    async def _check(self, account: str) -> dict:
+        if account not in CONFIG.ACCOUNTS and not _has_session(account):
+            # no session on disk: don't create a client just to learn that
+            state = {"account": account, "authorized": False, "error": "no_session"}
+        else:
+            async with self._sem:
+                try:
+                    authorized = await asyncio.wait_for(self.manager.is_authorized(account), self.timeout_s)
+                    state = {"account": account, "authorized": bool(authorized), "error": None}
+                except asyncio.TimeoutError:
+                    prev = self._cache.get(account) or {}
+                    state = {"account": account, "authorized": bool(prev.get("authorized")), "error": "timeout"}
+                except Exception as e:
+                    state = {"account": account, "authorized": False, "error": str(e) or "check_failed"}
+        state["checked_at"] = time.time()
+        self._cache[account] = state
+        return state
+
+    def _refresh(self, account: str) -> asyncio.Task:
+        task = self._checks.get(account)
+        if task is None or task.done():
+            task = asyncio.get_running_loop().create_task(self._check(account))
+            self._checks[account] = task
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def get(self, account: str, refresh: bool = False) -> dict:
+        state = self._cache.get(account)
+        if state is None or refresh:
+            return dict(await asyncio.shield(self._refresh(account)))
+        if time.time() - state["checked_at"] >= self.ttl_s:
+            self._refresh(account)
+        return dict(state, stale=time.time() - state["checked_at"] >= self.ttl_s)
+
+    async def get_many(self, accounts: list[str], refresh: bool = False) -> list[dict]:
+        return list(await asyncio.gather(*[self.get(a, refresh=refresh) for a in accounts]))
+
+    async def is_authorized(self, account: str) -> bool:
+        return bool((await self.get(account))["authorized"])
+
+    def invalidate(self, account: Optional[str] = None):
+        if account is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(account, None)
+
+
+account_status = AccountStatusService(
+    multi_manager,
+    getattr(CONFIG, "ACCOUNT_STATUS_TTL_S", 60),
+    getattr(CONFIG, "ACCOUNT_STATUS_CONCURRENCY", 5),
+    getattr(CONFIG, "ACCOUNT_STATUS_TIMEOUT_S", 8),
+)
+add_auth_listener(account_status.invalidate)
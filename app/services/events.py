@@ -0,0 +1,66 @@
+import asyncio
+
+
+# In-process pub/sub. Topics are plain strings such as "task:<id>"; each
+# subscriber gets its own bounded queue and the oldest event is dropped when
+# a slow consumer falls behind.
+class EventHub:
+    def __init__(self, queue_size: int = 1000):
+        self.queue_size = queue_size
+        self._subs: dict[str, set[asyncio.Queue]] = {}
+
+    def subscribe(self, topic: str, q: asyncio.Queue | None = None) -> asyncio.Queue:
+        # pass an existing queue to fan several topics into one consumer
+        if q is None:
+            q = asyncio.Queue(maxsize=self.queue_size)
+        self._subs.setdefault(topic, set()).add(q)
+        return q
+
+    def unsubscribe(self, topic: str, q: asyncio.Queue):
+        subs = self._subs.get(topic)
+        if not subs:
+            return
+        subs.discard(q)
+        if not subs:
+            del self._subs[topic]
+
+    def publish(self, topic: str, event: dict):
+        for q in list(self._subs.get(topic, ())):
+            if q.full():
+                try:
+                    q.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait(event)
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subs.get(topic))
+
+
+hub = EventHub()
+
+
+LOGS_TOPIC = "logs"
+
+
+def task_topic(task_id: str) -> str:
+    return f"task:{task_id}"
+
+
+def publish_log(row: dict, task_id: str | None = None):
+    if not hub.has_subscribers(LOGS_TOPIC):
+        return
+    created_at = row.get("created_at")
+    hub.publish(LOGS_TOPIC, {
+        "type": "log",
+        "task_id": task_id,
+        "account_name": row.get("account_name"),
+        "group_id": row.get("group_id"),
+        "group_title": row.get("group_title"),
+        "message_preview": row.get("message_preview"),
+        "status": row.get("status"),
+        "error": row.get("error"),
+        "message_id": row.get("message_id"),
+        "parse_mode": row.get("parse_mode"),
+        "created_at": created_at.isoformat() if created_at else None,
+    })
@@ -1,7 +1,9 @@
 from app.telegram_client import MultiTelegramManager
 from sqlalchemy.orm import Session
+from app.database import SessionLocal
 from app.models import GroupCache
 from app.config import CONFIG
+from app.services import group_titles, group_sync, member_counts
 from typing import Optional
 import json
 import time
@@ -9,44 +11,61 @@ import time
 _GROUP_CACHE: dict[tuple[str, bool], dict] = {}
 _CACHE_TTL_SECONDS = getattr(CONFIG, "GROUP_CACHE_TTL_SECONDS", 600)
 
-async def get_groups(manager: MultiTelegramManager, account: str, only_groups: bool = True, refresh: bool = False, db: Session | None = None):
+def _load_cached_groups(account: str, only_groups: bool) -> Optional[list]:
+    db: Session = SessionLocal()
+    try:
+        row = (
+            db.query(GroupCache)
+            .filter(GroupCache.account_name == account, GroupCache.only_groups == (1 if only_groups else 0))
+            .order_by(GroupCache.updated_at.desc())
+            .first()
+        )
+        if row:
+            return json.loads(row.data_json or "[]")
+        return None
+    except Exception:
+        return None
+    finally:
+        db.close()
+
+
+def _on_synced(account: str, rows: list):
+    now = time.monotonic()
+    for og in (False, True):
+        _GROUP_CACHE[(account, og)] = {"data": group_sync.groups_for(rows, og), "ts": now}
+    group_titles.remember(account, rows)
+
+
+group_sync.add_listener(_on_synced)
+
+
+# refresh brings the list up to date incrementally (group_sync) when the DB
+# cache is on; full=True forces a complete dialog scan. Member counts come
+# from their own cache (member_counts) and are filled in on the way out.
+async def get_groups(manager: MultiTelegramManager, account: str, only_groups: bool = True, refresh: bool = False, use_db: bool = True, full: bool = False):
+    data = await _list_groups(manager, account, only_groups, refresh, use_db, full)
+    return member_counts.fill(manager, account, data)
+
+
+async def _list_groups(manager: MultiTelegramManager, account: str, only_groups: bool, refresh: bool, use_db: bool, full: bool):
     key = (account, bool(only_groups))
+    use_db = use_db and bool(getattr(CONFIG, "GROUP_CACHE_ENABLED", 1))
     if not refresh:
         c = _GROUP_CACHE.get(key)
         if c and (time.monotonic() - c.get("ts", 0)) < _CACHE_TTL_SECONDS:
             return c.get("data", [])
-        if db is not None and getattr(CONFIG, "GROUP_CACHE_ENABLED", 1):
-            row = (
-                db.query(GroupCache)
-                .filter(GroupCache.account_name == account, GroupCache.only_groups == (1 if only_groups else 0))
-                .order_by(GroupCache.updated_at.desc())
-                .first()
-            )
-            if row:
-                try:
-                    data = json.loads(row.data_json or "[]")
-                    _GROUP_CACHE[key] = {"data": data, "ts": time.monotonic()}
-                    return data
-                except Exception:
-                    pass
+        if use_db:
+            data = _load_cached_groups(account, only_groups)
+            if data is not None:
+                _GROUP_CACHE[key] = {"data": data, "ts": time.monotonic()}
+                group_titles.remember(account, data)
+                return data
+    if use_db:
+        rows = await group_sync.sync(manager, account, full=full)
+        return group_sync.groups_for(rows, only_groups)
     data = await manager.get_joined_groups(account, only_groups=only_groups)
     _GROUP_CACHE[key] = {"data": data, "ts": time.monotonic()}
-    if db is not None and getattr(CONFIG, "GROUP_CACHE_ENABLED", 1):
-        try:
-            payload = json.dumps(data, ensure_ascii=False)
-            row = (
-                db.query(GroupCache)
-                .filter(GroupCache.account_name == account, GroupCache.only_groups == (1 if only_groups else 0))
-                .first()
-            )
-            if row:
-                row.data_json = payload
-            else:
-                row = GroupCache(account_name=account, only_groups=(1 if only_groups else 0), data_json=payload)
-                db.add(row)
-            db.commit()
-        except Exception:
-            pass
+    group_titles.remember(account, data)
     return data
 
 def clear_group_cache(account: Optional[str] = None, only_groups: Optional[bool] = None, db: Session | None = None):
@@ -58,6 +77,7 @@ def clear_group_cache(account: Optional[str] = None, only_groups: Optional[bool]
             if k in _GROUP_CACHE:
                 del _GROUP_CACHE[k]
                 removed += 1
+    group_sync.forget(account)
     if db is not None and getattr(CONFIG, "GROUP_CACHE_ENABLED", 1):
         q = db.query(GroupCache)
         if account is not None:
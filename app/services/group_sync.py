@@ -0,0 +1,302 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from sqlalchemy.orm import Session
+from app.config import CONFIG
+from app.database import SessionLocal
+from app.models import GroupCache
+from app.telegram_client import MultiTelegramManager, group_row, is_group, add_client_hook
+from app.services import peer_store
+
+
+# Incremental group list per account. One full dialog scan sets a baseline;
+# after that the list is kept current by join/leave/kick/title/migrate
+# updates (accounts that receive updates) and by a delta scan that pages
+# dialogs newest-first and stops at the position of the previous sync, so
+# a refresh only reads the dialogs with activity since then. A full scan
+# is redone after GROUP_FULL_SYNC_S to catch what neither of those sees
+# (e.g. a leave while the client was disconnected).
+#
+# account -> {"groups": {id: row}, "full_at", "position", "mode", "scanned"}
+_STATE: dict[str, dict] = {}
+_LOCKS: dict[str, asyncio.Lock] = {}
+_PENDING: dict[str, set[tuple[str, int]]] = {}
+_TIMERS: dict[str, asyncio.TimerHandle] = {}
+_listeners: list[Callable[[str, list], None]] = []
+_reconciler: Optional[asyncio.Task] = None
+
+# dialogs this much older than the last position are still re-read, for
+# clock skew and messages dated slightly before they were delivered
+_SLACK_S = 120
+_UPDATE_DEBOUNCE_S = 2.0
+_BATCH = 100
+
+
+def add_listener(fn: Callable[[str, list], None]):
+    _listeners.append(fn)
+
+
+def groups_for(rows: list, only_groups: bool) -> list:
+    return [r for r in rows if is_group(r)] if only_groups else list(rows)
+
+
+def _load(account: str) -> Optional[dict]:
+    st = _STATE.get(account)
+    if st is not None:
+        return st
+    db: Session = SessionLocal()
+    try:
+        row = (
+            db.query(GroupCache)
+            .filter(GroupCache.account_name == account, GroupCache.only_groups == 0)
+            .first()
+        )
+        if row is None or not row.sync_json:
+            return None
+        sync = json.loads(row.sync_json)
+        rows = json.loads(row.data_json or "[]")
+    except Exception:
+        return None
+    finally:
+        db.close()
+    st = {"groups": {r["id"]: r for r in rows}, **sync}
+    _STATE[account] = st
+    return st
+
+
+def _save(account: str, st: dict):
+    _STATE[account] = st
+    rows = list(st["groups"].values())
+    sync = {k: st.get(k) for k in ("full_at", "position", "mode", "scanned")}
+    db: Session = SessionLocal()
+    try:
+        for og in (0, 1):
+            payload = json.dumps(groups_for(rows, bool(og)), ensure_ascii=False)
+            row = (
+                db.query(GroupCache)
+                .filter(GroupCache.account_name == account, GroupCache.only_groups == og)
+                .first()
+            )
+            if row is None:
+                row = GroupCache(account_name=account, only_groups=og)
+                db.add(row)
+            row.data_json = payload
+            row.sync_json = json.dumps(sync) if og == 0 else None
+        db.commit()
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+    for fn in _listeners:
+        try:
+            fn(account, rows)
+        except Exception:
+            pass
+
+
+def forget(account: Optional[str] = None):
+    for acc in ([account] if account is not None else list(_STATE)):
+        _STATE.pop(acc, None)
+        _PENDING.pop(acc, None)
+
+
+def _is_chat(e) -> bool:
+    from telethon.tl.types import Channel, Chat, ChannelForbidden, ChatForbidden
+    return isinstance(e, (Channel, Chat, ChannelForbidden, ChatForbidden))
+
+
+# Applies what an entity says about membership; True if the list changed.
+def _apply(groups: dict, e, title: Optional[str]) -> bool:
+    row = group_row(e, title)
+    if row is None:
+        return _is_chat(e) and groups.pop(e.id, None) is not None
+    if groups.get(row["id"]) == row:
+        return False
+    groups[row["id"]] = row
+    return True
+
+
+async def _full(manager: MultiTelegramManager, account: str) -> dict:
+    started = time.time()
+    rows = await manager.get_joined_groups(account, only_groups=False)
+    st = {"groups": {r["id"]: r for r in rows}, "full_at": started, "position": started, "mode": "full", "scanned": None}
+    _save(account, st)
+    return st
+
+
+async def _delta(manager: MultiTelegramManager, account: str, st: dict) -> dict:
+    started = time.time()
+    since = datetime.fromtimestamp(st["position"] - _SLACK_S, tz=timezone.utc)
+    groups = dict(st["groups"])
+    scanned = 0
+    entities = []
+    async with manager.use(account) as acm:
+        # iter_dialogs pages GetDialogs by offset (date, id, peer); pinned
+        # dialogs come first regardless of date, so they don't end the scan
+        async for d in acm.client.iter_dialogs():
+            scanned += 1
+            if not d.pinned and d.date is not None and d.date < since:
+                break
+            entities.append(d.entity)
+            _apply(groups, d.entity, d.name)
+    peer_store.remember(account, entities)
+    st = {**st, "groups": groups, "position": started, "mode": "delta", "scanned": scanned}
+    _save(account, st)
+    return st
+
+
+# Brings the account's group list up to date: a delta scan when there is a
+# recent enough baseline, a full scan otherwise (or when full is set).
+async def sync(manager: MultiTelegramManager, account: str, full: bool = False) -> list:
+    lock = _LOCKS.setdefault(account, asyncio.Lock())
+    async with lock:
+        st = _load(account)
+        max_age = max(0, getattr(CONFIG, "GROUP_FULL_SYNC_S", 86400))
+        if full or st is None or time.time() - (st.get("full_at") or 0) > max_age:
+            st = await _full(manager, account)
+        else:
+            st = await _delta(manager, account, st)
+        return list(st["groups"].values())
+
+
+def stats(account: str) -> dict:
+    st = _load(account)
+    if st is None:
+        return {"account": account, "baseline": False}
+    return {
+        "account": account,
+        "baseline": True,
+        "groups": len(st["groups"]),
+        "mode": st.get("mode"),
+        "scanned": st.get("scanned"),
+        "full_at": st.get("full_at"),
+        "position": st.get("position"),
+        "pending_updates": len(_PENDING.get(account, ())),
+    }
+
+
+def _action_peer(update, self_id: Optional[int]) -> Optional[tuple[str, int]]:
+    from telethon.tl import types
+    msg = getattr(update, "message", None)
+    if not isinstance(msg, types.MessageService):
+        return None
+    action = msg.action
+    if isinstance(action, (types.MessageActionChatAddUser, types.MessageActionChatDeleteUser)):
+        users = getattr(action, "users", None) or [getattr(action, "user_id", None)]
+        if self_id is None or self_id not in users:
+            return None
+    elif not isinstance(action, (
+        types.MessageActionChatEditTitle,
+        types.MessageActionChatMigrateTo,
+        types.MessageActionChannelMigrateFrom,
+        types.MessageActionChatJoinedByLink,
+        types.MessageActionChatJoinedByRequest,
+    )):
+        return None
+    peer = msg.peer_id
+    if isinstance(peer, types.PeerChannel):
+        return "channel", peer.channel_id
+    if isinstance(peer, types.PeerChat):
+        return "chat", peer.chat_id
+    return None
+
+
+def _on_client(account: str, client):
+    from telethon import events
+    from telethon.tl import types
+
+    async def on_update(update):
+        if account not in _STATE:
+            return  # no baseline to keep current yet
+        if isinstance(update, types.UpdateChannel):
+            key = ("channel", update.channel_id)
+        elif isinstance(update, types.UpdateChat):
+            key = ("chat", update.chat_id)
+        else:
+            me = await client.get_me(input_peer=True)
+            key = _action_peer(update, getattr(me, "user_id", None))
+        if key is not None:
+            _queue(account, client, key)
+
+    client.add_event_handler(on_update, events.Raw(types=[
+        types.UpdateChannel,
+        types.UpdateChat,
+        types.UpdateNewMessage,
+        types.UpdateNewChannelMessage,
+    ]))
+
+
+add_client_hook(_on_client)
+
+
+def _queue(account: str, client, key: tuple[str, int]):
+    _PENDING.setdefault(account, set()).add(key)
+    if account not in _TIMERS:
+        loop = asyncio.get_running_loop()
+        _TIMERS[account] = loop.call_later(
+            _UPDATE_DEBOUNCE_S, lambda: loop.create_task(_refresh(account, client))
+        )
+
+
+# Re-reads the chats named by recent updates (batched GetChannels/GetChats)
+# and applies them to the stored list.
+async def _refresh(account: str, client):
+    from telethon.tl.functions.channels import GetChannelsRequest
+    from telethon.tl.functions.messages import GetChatsRequest
+    from telethon.tl.types import InputChannel, InputPeerChannel, PeerChannel
+    _TIMERS.pop(account, None)
+    keys = _PENDING.pop(account, set())
+    st = _STATE.get(account)
+    if st is None or not keys:
+        return
+    channels = []
+    for kind, cid in keys:
+        if kind != "channel":
+            continue
+        peer = peer_store.input_peer(account, cid)
+        if peer is None:
+            try:
+                peer = await client.get_input_entity(PeerChannel(cid))
+            except Exception:
+                continue
+        if isinstance(peer, InputPeerChannel):
+            channels.append(InputChannel(peer.channel_id, peer.access_hash))
+    chats = [cid for kind, cid in keys if kind == "chat"]
+    entities = []
+    for request_cls, items in ((GetChannelsRequest, channels), (GetChatsRequest, chats)):
+        for i in range(0, len(items), _BATCH):
+            try:
+                entities.extend((await client(request_cls(items[i:i + _BATCH]))).chats)
+            except Exception:
+                # left to the next delta scan
+                pass
+    groups = dict(st["groups"])
+    changed = False
+    for e in entities:
+        changed = _apply(groups, e, None) or changed
+    peer_store.remember(account, entities)
+    if changed:
+        _save(account, {**st, "groups": groups})
+
+
+async def _reconcile(manager: MultiTelegramManager):
+    while True:
+        await asyncio.sleep(max(60, getattr(CONFIG, "GROUP_RECONCILE_S", 1800)))
+        for account in list(_STATE):
+            acm = manager.managers.get(account)
+            # only clients that are up anyway; idle accounts catch up on
+            # their next refresh
+            if acm is None or not acm.connected or acm.state != "ready":
+                continue
+            try:
+                await sync(manager, account)
+            except Exception:
+                pass
+
+
+def start_reconciler(manager: MultiTelegramManager):
+    global _reconciler
+    if _reconciler is None or _reconciler.done():
+        _reconciler = asyncio.get_running_loop().create_task(_reconcile(manager))
@@ -0,0 +1,116 @@
+import asyncio
+import json
+from typing import Iterable, Optional
+from sqlalchemy import and_, bindparam
+from app.database import engine
+from app.models import GroupCache, SendLog
+from app.services import peer_store
+
+
+# account -> {group id -> title}, seeded from GroupCache and kept up to date
+# by get_groups. Sends only read this map; ids it does not know are logged
+# with the bare id as title and resolved in batches once the sends are done.
+_TITLES: dict[str, dict[int, str]] = {}
+_MISSES: dict[str, set[int]] = {}
+_BACKFILLS: dict[str, asyncio.Task] = {}
+_BACKFILL_BATCH = 100
+
+_send_logs = SendLog.__table__
+_group_caches = GroupCache.__table__
+
+
+def _real_id(gid: int) -> int:
+    return peer_store._real_id(gid)[0]
+
+
+def _load(account: str) -> dict[int, str]:
+    titles = _TITLES.get(account)
+    if titles is not None:
+        return titles
+    titles = {}
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                _group_caches.select().where(_group_caches.c.account_name == account)
+            ).all()
+        for r in rows:
+            for g in json.loads(r.data_json or "[]"):
+                if g.get("id") is not None and g.get("title"):
+                    titles[int(g["id"])] = g["title"]
+    except Exception:
+        pass
+    _TITLES[account] = titles
+    return titles
+
+
+def remember(account: str, groups: Iterable[dict]):
+    titles = _load(account)
+    for g in groups:
+        if g.get("id") is not None and g.get("title"):
+            titles[int(g["id"])] = g["title"]
+
+
+def title_for(account: str, gid: int) -> str:
+    title = _load(account).get(_real_id(int(gid)))
+    if title:
+        return title
+    _MISSES.setdefault(account, set()).add(int(gid))
+    return str(gid)
+
+
+def _entity_title(ent) -> Optional[str]:
+    return getattr(ent, 'title', None) or getattr(ent, 'username', None) or getattr(ent, 'first_name', None)
+
+
+async def _backfill(manager, account: str):
+    async with manager.use(account) as acm:
+        await _backfill_with(acm.client, account)
+
+
+async def _backfill_with(client, account: str):
+    titles = _load(account)
+    while _MISSES.get(account):
+        gids = list(_MISSES[account])[:_BACKFILL_BATCH]
+        _MISSES[account].difference_update(gids)
+        # list lookups go out as one GetChannels/GetChats/GetUsers per type
+        peers = [peer_store.input_peer(account, gid) or gid for gid in gids]
+        try:
+            entities = await client.get_entity(peers)
+        except Exception:
+            entities = []
+            for p in peers:
+                try:
+                    entities.append(await client.get_entity(p))
+                except Exception:
+                    entities.append(None)
+        peer_store.remember(account, (e for e in entities if e is not None))
+        updates = []
+        for gid, ent in zip(gids, entities):
+            title = _entity_title(ent) if ent is not None else None
+            if not title:
+                continue
+            titles[_real_id(gid)] = title
+            updates.append({"gid": gid, "placeholder": str(gid), "title": title})
+        if updates:
+            with engine.begin() as conn:
+                conn.execute(
+                    _send_logs.update()
+                    .where(and_(
+                        _send_logs.c.account_name == account,
+                        _send_logs.c.group_id == bindparam("gid"),
+                        _send_logs.c.group_title == bindparam("placeholder"),
+                    ))
+                    .values(group_title=bindparam("title")),
+                    updates,
+                )
+
+
+def schedule_backfill(manager, account: str):
+    if not _MISSES.get(account):
+        return
+    running = _BACKFILLS.get(account)
+    if running is not None and not running.done():
+        return
+    task = asyncio.get_running_loop().create_task(_backfill(manager, account))
+    _BACKFILLS[account] = task
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Optional
+from app.telegram_client import MultiTelegramManager
+from app.services.rate_limiter import rate_limiter
+
+
+# Telegram builds previews asynchronously; poll a pending one this long
+# before giving up and letting each send request it again.
+_PENDING_WAITS_S = (1, 2, 4)
+# prefetches per task (one per slice while still pending), so a preview
+# that never resolves doesn't stall every slice of a long task
+_MAX_PREFETCHES = 3
+_PREFETCHES: dict[str, int] = {}
+
+
+def has_link(text: str, entities: Optional[list]) -> bool:
+    from telethon.tl.types import MessageEntityUrl, MessageEntityTextUrl
+    if any(isinstance(e, (MessageEntityUrl, MessageEntityTextUrl)) for e in entities or ()):
+        return True
+    return "http://" in text or "https://" in text or "t.me/" in text
+
+
+def prefetch_due(task_id: str) -> bool:
+    n = _PREFETCHES.get(task_id, 0)
+    if n >= _MAX_PREFETCHES:
+        return False
+    _PREFETCHES[task_id] = n + 1
+    return True
+
+
+def forget(task_id: str):
+    _PREFETCHES.pop(task_id, None)
+
+
+# Resolves the preview for a message once. Returns (state, url): "ready"
+# with the page url to attach as InputMediaWebPage, "pending" if Telegram
+# had not finished building it (or the client is reconnecting, or the
+# account hit a flood wait), or "failed" when there is nothing to show.
+async def prefetch_preview(manager: MultiTelegramManager, account: str, text: str, entities: Optional[list]) -> tuple[str, Optional[str]]:
+    from telethon.errors import FloodWaitError
+    from telethon.tl.functions.messages import GetWebPagePreviewRequest
+    from telethon.tl.types import MessageMediaWebPage, WebPage, WebPagePending
+    acm = manager.get(account)
+    try:
+        await acm.ensure_connected()
+    except ConnectionError:
+        return "pending", None
+    for wait_s in (0,) + _PENDING_WAITS_S:
+        if wait_s:
+            await asyncio.sleep(wait_s)
+        try:
+            media = await acm.client(GetWebPagePreviewRequest(text, entities=entities or None))
+        except FloodWaitError as e:
+            # parks the account; the send loop sees it and reschedules
+            rate_limiter.block(account, int(getattr(e, "seconds", 0) or 0))
+            return "pending", None
+        except ConnectionError:
+            return "pending", None
+        except Exception:
+            return "failed", None
+        page = media.webpage if isinstance(media, MessageMediaWebPage) else None
+        if isinstance(page, WebPage):
+            return "ready", page.url
+        if not isinstance(page, WebPagePending):
+            return "failed", None
+    return "pending", None
@@ -0,0 +1,81 @@
+import hashlib
+import mimetypes
+import os
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import MediaFile
+from app.config import CONFIG
+
+
+MAX_ALBUM = 10
+
+# (account, media id) -> what to hand Telethon for the next send: the
+# InputFile from upload_file until the first send succeeds, then the
+# InputMediaPhoto/InputMediaDocument Telegram returned, so the bytes go up
+# once per account no matter how many targets or rounds follow.
+_HANDLES: dict[tuple[str, str], object] = {}
+
+
+def _media_dict(row: MediaFile) -> dict:
+    return {
+        "id": row.id,
+        "filename": row.filename,
+        "mime_type": row.mime_type,
+        "size": row.size,
+        "path": row.path,
+    }
+
+
+def save_media(data: bytes, filename: str, mime_type: Optional[str] = None) -> dict:
+    media_id = hashlib.sha256(data).hexdigest()[:24]
+    filename = os.path.basename(filename or "") or media_id
+    mime_type = mime_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    db: Session = SessionLocal()
+    try:
+        row = db.query(MediaFile).filter(MediaFile.id == media_id).first()
+        if row is not None and os.path.isfile(row.path):
+            return _media_dict(row)
+        os.makedirs(CONFIG.MEDIA_DIR, exist_ok=True)
+        # keep the extension; Telethon picks photo vs document from it
+        path = os.path.join(CONFIG.MEDIA_DIR, media_id + os.path.splitext(filename)[1].lower())
+        with open(path, "wb") as f:
+            f.write(data)
+        if row is None:
+            row = MediaFile(id=media_id)
+            db.add(row)
+        row.filename = filename
+        row.mime_type = mime_type
+        row.size = len(data)
+        row.path = path
+        db.commit()
+        return _media_dict(row)
+    finally:
+        db.close()
+
+
+def load_media(media_ids: list[str]) -> list[dict]:
+    if not media_ids:
+        return []
+    db: Session = SessionLocal()
+    try:
+        rows = {r.id: r for r in db.query(MediaFile).filter(MediaFile.id.in_(media_ids)).all()}
+    finally:
+        db.close()
+    missing = [m for m in media_ids if m not in rows]
+    if missing:
+        raise ValueError(f"unknown media: {', '.join(missing)}")
+    return [_media_dict(rows[m]) for m in media_ids]
+
+
+def get_handle(account: str, media_id: str):
+    return _HANDLES.get((account, media_id))
+
+
+def set_handle(account: str, media_id: str, handle):
+    _HANDLES[(account, media_id)] = handle
+
+
+def drop_handles(account: str, media_ids: list[str]):
+    for m in media_ids:
+        _HANDLES.pop((account, m), None)
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from app.config import CONFIG
+from app.database import engine
+from app.models import MemberCount
+from app.telegram_client import MultiTelegramManager
+from app.services import peer_store
+from app.services.rate_limiter import rate_limiter
+
+
+# Member counts for group lists, kept apart from the lists themselves: a
+# list is returned with whatever counts are cached and the missing or
+# expired ones are fetched by a background job per account (at most
+# MEMBER_COUNT_CONCURRENCY requests in flight). A flood wait pauses the
+# job; waits longer than the limiter's inline wait end it and the rest is
+# picked up by the first listing after the wait. Counts are keyed by the
+# bare chat id, so accounts in the same group share one entry.
+_members = MemberCount.__table__
+_BATCH = 50
+
+_COUNTS: dict[int, tuple[Optional[int], float]] = {}  # chat_id -> (count, fetched_at)
+_loaded = False
+_PENDING: dict[str, set[int]] = {}
+_JOBS: dict[str, asyncio.Task] = {}
+_PAUSED_UNTIL: dict[str, float] = {}
+
+
+def enabled() -> bool:
+    return bool(getattr(CONFIG, "GROUP_MEMBER_COUNT_ENABLED", 0))
+
+
+def _ttl_s() -> int:
+    return max(0, getattr(CONFIG, "MEMBER_COUNT_TTL_S", 86400))
+
+
+def _load():
+    global _loaded
+    if _loaded:
+        return
+    try:
+        with engine.connect() as conn:
+            for r in conn.execute(_members.select()):
+                at = r.updated_at
+                if at is not None and at.tzinfo is None:
+                    at = at.replace(tzinfo=timezone.utc)
+                _COUNTS[r.chat_id] = (r.count, at.timestamp() if at else 0.0)
+    except Exception:
+        pass
+    _loaded = True
+
+
+def _store(counts: dict[int, Optional[int]]):
+    if not counts:
+        return
+    now = time.time()
+    for chat_id, n in counts.items():
+        _COUNTS[chat_id] = (n, now)
+    at = datetime.fromtimestamp(now, tz=timezone.utc)
+    try:
+        with engine.begin() as conn:
+            conn.execute(_members.delete().where(_members.c.chat_id.in_(list(counts))))
+            conn.execute(_members.insert(), [
+                {"chat_id": chat_id, "count": n, "updated_at": at} for chat_id, n in counts.items()
+            ])
+    except Exception:
+        # still cached in memory until the next restart
+        pass
+
+
+def pending(account: str) -> int:
+    return len(_PENDING.get(account, ()))
+
+
+# Copies of rows with the cached counts filled in; rows without a fresh
+# count are queued for the account's background job.
+def fill(manager: MultiTelegramManager, account: str, rows: list) -> list:
+    if not enabled():
+        return rows
+    _load()
+    now = time.time()
+    ttl = _ttl_s()
+    out = []
+    missing = []
+    for r in rows:
+        c = _COUNTS.get(r["id"])
+        if c is None or now - c[1] > ttl:
+            missing.append(r["id"])
+        # an expired count is still better than none until it is refetched
+        if c is not None and c[0] is not None:
+            r = {**r, "member_count": c[0]}
+        out.append(r)
+    if missing:
+        _enqueue(manager, account, missing)
+    return out
+
+
+def _enqueue(manager: MultiTelegramManager, account: str, ids: list[int]):
+    _PENDING.setdefault(account, set()).update(ids)
+    if time.time() < _PAUSED_UNTIL.get(account, 0):
+        return
+    job = _JOBS.get(account)
+    if job is None or job.done():
+        _JOBS[account] = asyncio.get_running_loop().create_task(_run(manager, account))
+
+
+async def _run(manager: MultiTelegramManager, account: str):
+    from telethon.errors import FloodWaitError
+    sem = asyncio.Semaphore(max(1, getattr(CONFIG, "MEMBER_COUNT_CONCURRENCY", 4)))
+    try:
+        async with manager.use(account) as acm:
+            while _PENDING.get(account):
+                queue = _PENDING[account]
+                batch = [queue.pop() for _ in range(min(_BATCH, len(queue)))]
+                counts: dict[int, Optional[int]] = {}
+                flood = 0
+
+                async def one(chat_id: int):
+                    nonlocal flood
+                    async with sem:
+                        if flood:
+                            queue.add(chat_id)
+                            return
+                        peer = peer_store.input_peer(account, chat_id)
+                        if peer is None:
+                            # no usable access hash (min channel); retried after the TTL
+                            counts[chat_id] = None
+                            return
+                        try:
+                            counts[chat_id] = await acm.member_count(peer)
+                        except FloodWaitError as e:
+                            flood = max(flood, int(getattr(e, "seconds", 0) or 0), 1)
+                            queue.add(chat_id)
+
+                await asyncio.gather(*(one(i) for i in batch))
+                # None too, so chats we can't read aren't retried before the TTL
+                _store(counts)
+                if flood:
+                    if flood > rate_limiter.max_inline_wait_s:
+                        _PAUSED_UNTIL[account] = time.time() + flood
+                        return
+                    await asyncio.sleep(flood)
+    except Exception:
+        # connection trouble: the queue stays for the next listing
+        pass
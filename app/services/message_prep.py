@@ -0,0 +1,56 @@
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Optional
+
+
+_PREPARED: "OrderedDict[str, Optional[tuple[str, list]]]" = OrderedDict()
+_MAX_PREPARED = 256
+_MENTION_URL = re.compile(r'^@|\+|tg://user\?id=(\d+)')
+
+
+def message_key(text: str, parse_mode: Optional[str]) -> str:
+    return hashlib.sha256(((parse_mode or "") + "|" + text).encode("utf-8")).hexdigest()[:16]
+
+
+def _parse(text: str, parse_mode: Optional[str]) -> Optional[tuple[str, list]]:
+    if not text:
+        # media sent without a caption
+        return text, []
+    from telethon.extensions import markdown, html
+    from telethon.tl import types
+    if parse_mode == "markdown":
+        parser = markdown
+    elif parse_mode == "html":
+        parser = html
+    else:
+        return text, []
+    parsed, entities = parser.parse(text)
+    if text and not parsed and not entities:
+        raise ValueError("Failed to parse message")
+    if not parsed:
+        raise ValueError("The message cannot be empty")
+    for e in entities:
+        # mention links have to be resolved against an account's client, so
+        # leave those messages to Telethon's per-send parsing
+        if isinstance(e, types.MessageEntityTextUrl) and _MENTION_URL.match(e.url):
+            return None
+        if isinstance(e, (types.MessageEntityMentionName, types.InputMessageEntityMentionName)):
+            return None
+    # 0-length entities are rejected by Telegram, same as Telethon strips them
+    return parsed, [e for e in entities if e.length]
+
+
+# Parses markdown/html once per distinct message. Returns (text, entities)
+# ready for send_message(formatting_entities=...), or None when the message
+# must be parsed per send. Raises ValueError on unparseable input.
+def prepare_message(text: str, parse_mode: Optional[str]) -> Optional[tuple[str, list]]:
+    key = message_key(text, parse_mode)
+    if key in _PREPARED:
+        _PREPARED.move_to_end(key)
+        return _PREPARED[key]
+    prepared = _parse(text, parse_mode)
+    _PREPARED[key] = prepared
+    if len(_PREPARED) > _MAX_PREPARED:
+        _PREPARED.popitem(last=False)
+    return prepared
@@ -0,0 +1,116 @@
+from typing import Iterable, Optional
+from sqlalchemy import and_
+from app.database import engine
+from app.models import Peer
+
+
+# Per-account (peer_id -> (peer_type, access_hash)) so sends can build an
+# InputPeer directly instead of asking Telethon to find the access hash,
+# which after a cold start means a dialog scan. Loaded lazily per account.
+_PEERS: dict[str, dict[int, tuple[str, int]]] = {}
+
+_peers = Peer.__table__
+
+
+def _load(account: str) -> dict[int, tuple[str, int]]:
+    peers = _PEERS.get(account)
+    if peers is not None:
+        return peers
+    peers = {}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            _peers.select().where(_peers.c.account_name == account)
+        ).all()
+    for r in rows:
+        peers[r.peer_id] = (r.peer_type, r.access_hash or 0)
+    _PEERS[account] = peers
+    return peers
+
+
+def _peer_of(entity) -> Optional[tuple[int, str, int]]:
+    from telethon.tl.types import Channel, Chat
+    if isinstance(entity, Channel):
+        # "min" channels come without a usable access hash
+        if getattr(entity, "min", False) or entity.access_hash is None:
+            return None
+        return entity.id, "channel", entity.access_hash
+    if isinstance(entity, Chat):
+        return entity.id, "chat", 0
+    return None
+
+
+def remember(account: str, entities: Iterable) -> int:
+    peers = _load(account)
+    changed: dict[int, dict] = {}
+    for e in entities:
+        p = _peer_of(e)
+        if p is None:
+            continue
+        peer_id, peer_type, access_hash = p
+        if peers.get(peer_id) == (peer_type, access_hash):
+            continue
+        peers[peer_id] = (peer_type, access_hash)
+        changed[peer_id] = {
+            "account_name": account,
+            "peer_id": peer_id,
+            "peer_type": peer_type,
+            "access_hash": access_hash,
+        }
+    if changed:
+        try:
+            with engine.begin() as conn:
+                conn.execute(_peers.delete().where(and_(
+                    _peers.c.account_name == account,
+                    _peers.c.peer_id.in_(list(changed)),
+                )))
+                conn.execute(_peers.insert(), list(changed.values()))
+        except Exception:
+            # still cached in memory; persisted again on the next change
+            pass
+    return len(changed)
+
+
+def forget(account: str, peer_id: int):
+    real_id = _real_id(peer_id)[0]
+    if _load(account).pop(real_id, None) is None:
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(_peers.delete().where(and_(
+                _peers.c.account_name == account,
+                _peers.c.peer_id == real_id,
+            )))
+    except Exception:
+        pass
+
+
+def _real_id(peer_id: int) -> tuple[int, Optional[str]]:
+    # group ids are stored bare (as get_joined_groups returns them) but
+    # marked -100… / -… ids are accepted too and disambiguate the type
+    if peer_id >= 0:
+        return peer_id, None
+    from telethon import utils
+    from telethon.tl.types import PeerChannel, PeerChat
+    real_id, cls = utils.resolve_id(peer_id)
+    if cls is PeerChannel:
+        return real_id, "channel"
+    if cls is PeerChat:
+        return real_id, "chat"
+    return real_id, None
+
+
+def input_peer(account: str, peer_id: int):
+    real_id, want = _real_id(int(peer_id))
+    p = _load(account).get(real_id)
+    if p is None:
+        return None
+    peer_type, access_hash = p
+    if want is not None and want != peer_type:
+        return None
+    from telethon.tl.types import InputPeerChannel, InputPeerChat
+    if peer_type == "channel":
+        return InputPeerChannel(real_id, access_hash)
+    if peer_type == "chat":
+        return InputPeerChat(real_id)
+    return None
+
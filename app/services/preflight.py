@@ -0,0 +1,149 @@
+from typing import Optional
+from telethon.errors import FloodWaitError
+from telethon.tl.functions.channels import GetChannelsRequest
+from telethon.tl.functions.messages import GetChatsRequest
+from telethon.tl.types import (
+    Channel, Chat, ChannelForbidden, ChatForbidden,
+    InputChannel, InputPeerChannel, InputPeerChat,
+)
+from app.telegram_client import MultiTelegramManager
+from app.services import peer_store, group_titles
+from app.services.rate_limiter import rate_limiter
+
+
+_BATCH = 100
+
+
+def _send_blocked(rights) -> bool:
+    return bool(rights is not None and getattr(rights, "send_messages", False))
+
+
+def _channel_reason(e: Channel) -> Optional[str]:
+    if e.left:
+        return "left"
+    if e.broadcast and not (e.creator or (e.admin_rights is not None and e.admin_rights.post_messages)):
+        return "read_only"
+    admin = bool(e.creator) or e.admin_rights is not None
+    if not admin and (_send_blocked(e.banned_rights) or _send_blocked(e.default_banned_rights)):
+        return "read_only"
+    return None
+
+
+def _chat_reason(e: Chat) -> Optional[str]:
+    if e.deactivated or e.migrated_to is not None:
+        return "migrated"
+    if e.left:
+        return "left"
+    admin = bool(e.creator) or e.admin_rights is not None
+    if not admin and _send_blocked(e.default_banned_rights):
+        return "read_only"
+    return None
+
+
+def _reason(entity) -> Optional[str]:
+    if isinstance(entity, ChannelForbidden):
+        return "banned"
+    if isinstance(entity, ChatForbidden):
+        return "kicked"
+    if isinstance(entity, Channel):
+        return _channel_reason(entity)
+    if isinstance(entity, Chat):
+        return _chat_reason(entity)
+    return "not_a_group"
+
+
+async def _fetch(client, request_cls, items: list) -> tuple[list, Optional[str]]:
+    try:
+        return list((await client(request_cls(items))).chats), None
+    except FloodWaitError as e:
+        return [], f"flood_wait:{int(getattr(e, 'seconds', 0) or 0)}"
+    except Exception:
+        if len(items) == 1:
+            return [], "inaccessible"
+    # one bad id fails the whole batch; fall back to single lookups
+    chats = []
+    for item in items:
+        got, err = await _fetch(client, request_cls, [item])
+        if err and err.startswith("flood_wait"):
+            return chats, err
+        chats.extend(got)
+    return chats, None
+
+
+# Resolves every target with batched GetChannels/GetChats before a task
+# runs. Returns which targets can be sent to, which would fail (with a
+# reason) and which could not be checked; the peer table and title map are
+# warmed as a side effect.
+async def preflight_targets(manager: MultiTelegramManager, account: str, group_ids: list[int]) -> dict:
+    async with manager.use(account) as acm:
+        return await _preflight(acm.client, account, group_ids)
+
+
+async def _preflight(client, account: str, group_ids: list[int]) -> dict:
+    # channel/chat id -> the target id as the caller gave it
+    channels: dict[int, int] = {}
+    chats: dict[int, int] = {}
+    channel_inputs: dict[int, InputChannel] = {}
+    dropped: list[dict] = []
+    for gid in group_ids:
+        peer = peer_store.input_peer(account, gid)
+        if peer is None:
+            try:
+                peer = await client.get_input_entity(gid)
+            except Exception:
+                dropped.append({"group_id": gid, "reason": "unresolved"})
+                continue
+        if isinstance(peer, InputPeerChannel):
+            channels[peer.channel_id] = gid
+            channel_inputs[peer.channel_id] = InputChannel(peer.channel_id, peer.access_hash)
+        elif isinstance(peer, InputPeerChat):
+            chats[peer.chat_id] = gid
+        else:
+            dropped.append({"group_id": gid, "reason": "not_a_group"})
+
+    entities = []
+    unchecked: list[int] = []
+    for source, request_cls, inputs in (
+        (channels, GetChannelsRequest, lambda ids: [channel_inputs[i] for i in ids]),
+        (chats, GetChatsRequest, lambda ids: ids),
+    ):
+        ids = list(source)
+        for i in range(0, len(ids), _BATCH):
+            batch = ids[i:i + _BATCH]
+            got, err = await _fetch(client, request_cls, inputs(batch))
+            entities.extend(got)
+            if err and err.startswith("flood_wait"):
+                rate_limiter.block(account, int(err.split(":", 1)[1]))
+                seen = {e.id for e in got}
+                unchecked.extend(source[x] for x in ids[i:] if x not in seen)
+                break
+
+    peer_store.remember(account, entities)
+    group_titles.remember(account, (
+        {"id": e.id, "title": getattr(e, "title", None)} for e in entities
+    ))
+    found: dict[int, object] = {}
+    for e in entities:
+        if isinstance(e, (Channel, ChannelForbidden)) and e.id in channels:
+            found[channels[e.id]] = e
+        elif isinstance(e, (Chat, ChatForbidden)) and e.id in chats:
+            found[chats[e.id]] = e
+
+    sendable: list[int] = []
+    unchecked_set = set(unchecked)
+    for gid in list(channels.values()) + list(chats.values()):
+        if gid in unchecked_set:
+            continue
+        e = found.get(gid)
+        reason = "inaccessible" if e is None else _reason(e)
+        if reason is None:
+            sendable.append(gid)
+        else:
+            dropped.append({"group_id": gid, "reason": reason, "title": getattr(e, "title", None)})
+    # keep the caller's target order
+    keep = set(sendable) | unchecked_set
+    return {
+        "sendable": [g for g in group_ids if g in keep],
+        "dropped": dropped,
+        "unchecked": unchecked,
+    }
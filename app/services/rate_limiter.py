@@ -0,0 +1,138 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import AccountLimit
+from app.config import CONFIG
+
+
+class _Bucket:
+    __slots__ = ("tokens", "refilled_at", "blocked_until", "lock")
+
+    def __init__(self, tokens: float):
+        self.tokens = tokens
+        self.refilled_at = time.monotonic()
+        # wall clock so it survives a restart via AccountLimit
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+
+# One token bucket per account shared by every send path. FloodWaitError
+# parks the account until the time Telegram asked for.
+class AccountRateLimiter:
+    def __init__(self, rate_per_min: float, burst: int, max_inline_wait_s: int):
+        self.rate_per_s = max(0.01, rate_per_min / 60.0)
+        self.burst = max(1, burst)
+        self.max_inline_wait_s = max(0, max_inline_wait_s)
+        self._buckets: dict[str, _Bucket] = {}
+
+    def _bucket(self, account: str) -> _Bucket:
+        b = self._buckets.get(account)
+        if b is None:
+            b = _Bucket(float(self.burst))
+            self._buckets[account] = b
+        return b
+
+    def _refill(self, b: _Bucket):
+        now = time.monotonic()
+        b.tokens = min(float(self.burst), b.tokens + (now - b.refilled_at) * self.rate_per_s)
+        b.refilled_at = now
+
+    def blocked_for(self, account: str) -> float:
+        b = self._buckets.get(account)
+        if b is None:
+            return 0.0
+        return max(0.0, b.blocked_until - time.time())
+
+    def next_allowed_in(self, account: str) -> float:
+        b = self._bucket(account)
+        self._refill(b)
+        token_wait = 0.0 if b.tokens >= 1 else (1 - b.tokens) / self.rate_per_s
+        return max(self.blocked_for(account), token_wait)
+
+    async def acquire(self, account: str):
+        b = self._bucket(account)
+        async with b.lock:
+            while True:
+                blocked = b.blocked_until - time.time()
+                if blocked > 0:
+                    await asyncio.sleep(blocked)
+                    continue
+                self._refill(b)
+                if b.tokens >= 1:
+                    b.tokens -= 1
+                    return
+                await asyncio.sleep((1 - b.tokens) / self.rate_per_s)
+
+    def block(self, account: str, seconds: int):
+        b = self._bucket(account)
+        until = time.time() + max(0, seconds)
+        if until <= b.blocked_until:
+            return
+        b.blocked_until = until
+        b.tokens = 0.0
+        self._persist(account, until, seconds)
+
+    def _persist(self, account: str, until: float, seconds: int):
+        db: Session = SessionLocal()
+        try:
+            row = db.query(AccountLimit).filter(AccountLimit.account_name == account).first()
+            if row is None:
+                row = AccountLimit(account_name=account)
+                db.add(row)
+            row.blocked_until = datetime.fromtimestamp(until, tz=timezone.utc)
+            row.flood_wait_s = int(seconds)
+            db.commit()
+        except Exception:
+            db.rollback()
+        finally:
+            db.close()
+
+    def load(self):
+        db: Session = SessionLocal()
+        try:
+            now = time.time()
+            for row in db.query(AccountLimit).all():
+                if row.blocked_until is None:
+                    continue
+                ts = row.blocked_until
+                if ts.tzinfo is None:
+                    ts = ts.replace(tzinfo=timezone.utc)
+                until = ts.timestamp()
+                if until > now:
+                    b = self._bucket(row.account_name)
+                    b.blocked_until = until
+                    b.tokens = 0.0
+        finally:
+            db.close()
+
+    def status(self, account: str) -> dict:
+        blocked = self.blocked_for(account)
+        wait = self.next_allowed_in(account)
+        return {
+            "account": account,
+            "blocked_until": datetime.fromtimestamp(time.time() + blocked, tz=timezone.utc).isoformat() if blocked > 0 else None,
+            "next_send_at": datetime.fromtimestamp(time.time() + wait, tz=timezone.utc).isoformat(),
+            "next_send_in_s": round(wait, 2),
+        }
+
+    def accounts(self) -> list[str]:
+        return list(self._buckets.keys())
+
+
+rate_limiter = AccountRateLimiter(
+    rate_per_min=getattr(CONFIG, "ACCOUNT_SEND_RATE_PER_MIN", 40),
+    burst=getattr(CONFIG, "ACCOUNT_SEND_BURST", 5),
+    max_inline_wait_s=getattr(CONFIG, "FLOOD_WAIT_INLINE_MAX_S", 60),
+)
+
+
+def flood_wait_seconds(err: Optional[str]) -> Optional[int]:
+    if err and err.startswith("flood_wait:"):
+        try:
+            return int(err.split(":", 1)[1])
+        except ValueError:
+            return 0
+    return None
@@ -0,0 +1,160 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import ScheduledMessage
+from app.telegram_client import MultiTelegramManager
+from app.services.rate_limiter import flood_wait_seconds
+
+
+# Telegram keeps at most 100 scheduled messages per chat, up to a year
+# ahead, and wants the date comfortably in the future.
+MAX_SCHEDULED_PER_CHAT = 100
+MAX_SCHEDULE_AHEAD_S = 365 * 24 * 3600
+MIN_ROUND_INTERVAL_S = 60
+# a round submitted late (after a flood wait) goes out this long from now
+_MIN_LEAD_S = 30
+
+# ScheduledMessage.status:
+#   pending    not handed to Telegram yet (a flood wait interrupted it);
+#              the task retries it before it finishes
+#   submitted  accepted into the chat's scheduled messages; whether Telegram
+#              later delivered it, or someone deleted it, is not tracked
+#   failed     Telegram refused it
+#   cancelled  removed by a schedule_cancel task (task_bulk)
+
+
+def validate_native_schedule(rounds: int, round_interval_s: int) -> Optional[str]:
+    if rounds < 2:
+        return "native_schedule needs rounds > 1"
+    if rounds - 1 > MAX_SCHEDULED_PER_CHAT:
+        return f"native_schedule allows at most {MAX_SCHEDULED_PER_CHAT + 1} rounds"
+    if round_interval_s < MIN_ROUND_INTERVAL_S:
+        return f"native_schedule needs round_interval_s >= {MIN_ROUND_INTERVAL_S}"
+    if (rounds - 1) * round_interval_s > MAX_SCHEDULE_AHEAD_S:
+        return "native_schedule cannot schedule more than 365 days ahead"
+    return None
+
+
+# Submits rounds 2..N for one target as Telegram scheduled messages, timed
+# from that target's round-1 send. Returns ScheduledMessage rows.
+async def schedule_later_rounds(
+    manager: MultiTelegramManager,
+    task_id: str,
+    account: str,
+    group_id: int,
+    sent_at: datetime,
+    rounds: int,
+    round_interval_s: int,
+    **send_kwargs,
+) -> list[dict]:
+    rows = []
+    now = datetime.now(timezone.utc)
+    for round_no in range(2, rounds + 1):
+        at = sent_at + timedelta(seconds=(round_no - 1) * round_interval_s)
+        ok, err, msg_id = await manager.send_message_to_group(account, group_id=group_id, schedule=at, **send_kwargs)
+        rows.append({
+            "task_id": task_id,
+            "account_name": account,
+            "group_id": group_id,
+            "round": round_no,
+            "message_id": msg_id if ok else None,
+            "schedule_at": at,
+            "status": "submitted" if ok else "failed",
+            "error": None if ok else (err or "send_failed"),
+            "created_at": now,
+        })
+        if flood_wait_seconds(err) is not None:
+            # the account is parked; the remaining rounds would hit the same
+            # wait. Kept pending so the task submits them after the wait.
+            rows[-1]["status"] = "pending"
+            for later in range(round_no + 1, rounds + 1):
+                rows.append({**rows[-1], "round": later, "schedule_at": sent_at + timedelta(seconds=(later - 1) * round_interval_s)})
+            break
+    return rows
+
+
+def pending_rounds(task_id: str) -> list[ScheduledMessage]:
+    db: Session = SessionLocal()
+    try:
+        return (
+            db.query(ScheduledMessage)
+            .filter(ScheduledMessage.task_id == task_id, ScheduledMessage.status == "pending")
+            .order_by(ScheduledMessage.group_id.asc(), ScheduledMessage.round.asc())
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def _aware(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+
+# Submits one pending round. A round whose time has passed during the wait
+# goes out _MIN_LEAD_S from now instead of being dropped. Returns the flood
+# wait in seconds if Telegram asked for one (the row stays pending).
+async def submit_pending_round(manager: MultiTelegramManager, row: ScheduledMessage, **send_kwargs) -> Optional[int]:
+    at = max(_aware(row.schedule_at), datetime.now(timezone.utc) + timedelta(seconds=_MIN_LEAD_S))
+    ok, err, msg_id = await manager.send_message_to_group(row.account_name, group_id=row.group_id, schedule=at, **send_kwargs)
+    wait_s = flood_wait_seconds(err)
+    if wait_s is not None:
+        _update(row.id, error=err)
+        return wait_s
+    _update(
+        row.id,
+        status="submitted" if ok else "failed",
+        message_id=msg_id if ok else None,
+        schedule_at=at,
+        error=None if ok else (err or "send_failed"),
+    )
+    return None
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return ts.isoformat() if ts else None
+
+
+def scheduled_counts(task_id: str) -> dict:
+    db: Session = SessionLocal()
+    try:
+        rows = (
+            db.query(ScheduledMessage.status, func.count())
+            .filter(ScheduledMessage.task_id == task_id)
+            .group_by(ScheduledMessage.status)
+            .all()
+        )
+        return {status: n for status, n in rows}
+    finally:
+        db.close()
+
+
+def list_scheduled(task_id: str) -> list[dict]:
+    db: Session = SessionLocal()
+    try:
+        rows = (
+            db.query(ScheduledMessage)
+            .filter(ScheduledMessage.task_id == task_id)
+            .order_by(ScheduledMessage.round.asc(), ScheduledMessage.id.asc())
+            .all()
+        )
+        return [{
+            "group_id": r.group_id,
+            "round": r.round,
+            "message_id": r.message_id,
+            "schedule_at": _iso(r.schedule_at),
+            "status": r.status,
+            "error": r.error,
+        } for r in rows]
+    finally:
+        db.close()
+
+
+def _update(row_id: int, **values):
+    db: Session = SessionLocal()
+    try:
+        db.query(ScheduledMessage).filter(ScheduledMessage.id == row_id).update(values, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,156 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+from app.config import CONFIG
+from app.services import task_control
+from app.services.task_runner import run_task_slice
+
+
+class SchedulerFull(Exception):
+    def __init__(self, depth: int, eta_s: float):
+        super().__init__("scheduler_queue_full")
+        self.depth = depth
+        self.eta_s = eta_s
+
+
+class _Job:
+    __slots__ = ("task_id", "account", "run_at", "est_s", "started")
+
+    def __init__(self, task_id: str, account: str, run_at: float, est_s: float):
+        self.task_id = task_id
+        self.account = account
+        self.run_at = run_at
+        self.est_s = est_s
+        self.started = False
+
+
+# Bounded worker pool over a FIFO of task slices. A slice is at most
+# SCHEDULER_SLICE_SENDS sends of a task (or the rest of its round); after it
+# returns the job goes to the back of the queue, which gives round-robin
+# between tasks. Only one slice per account runs at a time so sends from two
+# tasks on the same account never interleave. submit() rejects new work with
+# SchedulerFull once max_queue slices are waiting; force is only for tasks
+# that already exist (resume at startup) and must not be dropped.
+class SendScheduler:
+    def __init__(self, runner: Callable[[str], Awaitable[Optional[float]]], workers: int, max_queue: int):
+        self._runner = runner
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self._jobs: deque[_Job] = deque()
+        self._running: dict[str, _Job] = {}
+        self._busy_accounts: set[str] = set()
+        self._worker_tasks: list[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    @property
+    def started(self) -> bool:
+        return bool(self._worker_tasks)
+
+    def start(self):
+        if self._worker_tasks:
+            return
+        self._worker_tasks = [asyncio.create_task(self._worker_loop()) for _ in range(self.workers)]
+
+    async def shutdown(self):
+        tasks, self._worker_tasks = self._worker_tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def pending(self) -> int:
+        return sum(1 for j in self._jobs if not j.started)
+
+    def eta_s(self) -> float:
+        queued = sum(j.est_s for j in self._jobs if not j.started)
+        running = sum(j.est_s for j in self._running.values())
+        return (queued + running) / self.workers
+
+    def is_full(self) -> bool:
+        return self.pending() >= self.max_queue
+
+    def submit(self, task_id: str, account: str, est_s: float = 0.0, delay_s: float = 0.0, paused: bool = False, force: bool = False):
+        if not force and self.is_full():
+            raise SchedulerFull(self.pending(), self.eta_s())
+        if task_id in self._running or any(j.task_id == task_id for j in self._jobs):
+            return
+        task_control.register(task_id, paused=paused)
+        self._jobs.append(_Job(task_id, account, time.monotonic() + max(0.0, delay_s), max(0.0, est_s)))
+        self.notify()
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "running": [{"task_id": j.task_id, "account": j.account} for j in self._running.values()],
+            "queued": [
+                {"task_id": j.task_id, "account": j.account, "run_in_s": round(max(0.0, j.run_at - now), 1)}
+                for j in self._jobs
+            ],
+            "pending": self.pending(),
+            "eta_s": round(self.eta_s(), 1),
+        }
+
+    def _eligible(self, job: _Job) -> bool:
+        if job.account in self._busy_accounts:
+            return False
+        ctrl = task_control.get(job.task_id)
+        if ctrl is not None and ctrl.stopped:
+            return True
+        if ctrl is not None and ctrl.paused:
+            return False
+        return True
+
+    def _pick(self) -> Optional[_Job]:
+        now = time.monotonic()
+        for job in self._jobs:
+            if not self._eligible(job):
+                continue
+            ctrl = task_control.get(job.task_id)
+            if job.run_at > now and not (ctrl is not None and ctrl.stopped):
+                continue
+            self._jobs.remove(job)
+            return job
+        return None
+
+    def _next_wait(self) -> float:
+        now = time.monotonic()
+        waits = [j.run_at - now for j in self._jobs if self._eligible(j)]
+        return min([5.0] + [max(0.0, w) for w in waits])
+
+    async def _worker_loop(self):
+        while True:
+            job = self._pick()
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_wait())
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            job.started = True
+            self._busy_accounts.add(job.account)
+            self._running[job.task_id] = job
+            again = None
+            try:
+                again = await self._runner(job.task_id)
+            except Exception:
+                again = None
+            finally:
+                self._busy_accounts.discard(job.account)
+                self._running.pop(job.task_id, None)
+            if again is not None:
+                job.run_at = time.monotonic() + max(0.0, again)
+                self._jobs.append(job)
+            self.notify()
+
+
+scheduler = SendScheduler(
+    run_task_slice,
+    workers=getattr(CONFIG, "SCHEDULER_WORKERS", 4),
+    max_queue=getattr(CONFIG, "SCHEDULER_MAX_QUEUE", 100),
+)
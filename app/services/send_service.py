@@ -1,12 +1,15 @@
 import asyncio
 import time
 import hashlib
-import random
-import json
-from sqlalchemy.orm import Session
+from datetime import datetime, timezone
+from typing import Optional
 from app.telegram_client import MultiTelegramManager
-from app.models import SendLog, Task, TaskEvent
-from app.config import CONFIG
+from app.database import engine
+from app.models import SendLog
+from app.services.rate_limiter import flood_wait_seconds
+from app.services.events import publish_log
+from app.services.message_prep import prepare_message
+from app.services import group_titles
 
 
 _SEND_CACHE: dict[str, float] = {}
@@ -33,74 +36,113 @@ def _should_skip(account: str, gid: int, message: str, parse_mode: str, disable_
     return False
 
 
-async def send_to_groups(
+def _write_send_logs(rows: list[dict]):
+    if not rows:
+        return
+    with engine.begin() as conn:
+        conn.execute(SendLog.__table__.insert(), rows)
+
+
+async def _send_one(
     manager: MultiTelegramManager,
-    db: Session,
     account: str,
-    group_ids: list[int],
+    gid: int,
     message: str,
     parse_mode: str,
     disable_web_page_preview: bool,
-    delay_ms: int,
-    retry_max: int = 0,
-    retry_delay_ms: int = 1500,
+    retry_max: int,
+    retry_delay_ms: int,
+    prepared: Optional[tuple[str, list]] = None,
+    media: Optional[list[dict]] = None,
 ):
-    total = len(group_ids)
-    success = 0
-    failed = 0
-    base_delay_ms = max(delay_ms, 0)
-    min_delay_ms = max(getattr(CONFIG, "SEND_MIN_DELAY_MS", 1500), 0)
-    jitter_pct = max(0.0, min(getattr(CONFIG, "SEND_JITTER_PCT", 0.15), 0.5))
-    base = max(base_delay_ms, min_delay_ms)
-    for idx, gid in enumerate(group_ids):
-        skipped = _should_skip(account, gid, message, parse_mode, disable_web_page_preview)
-        msg_id = None
-        err = None
-        if skipped:
-            status = "skipped"
-        else:
-            attempt = 0
-            ok = False
-            while attempt <= max(0, retry_max):
+    dedup_text = message
+    if media:
+        dedup_text = message + "|" + ",".join(m["id"] for m in media)
+    skipped = _should_skip(account, gid, dedup_text, parse_mode, disable_web_page_preview)
+    msg_id = None
+    err = None
+    flood_wait_s = None
+    if skipped:
+        status = "skipped"
+    else:
+        attempt = 0
+        ok = False
+        while attempt <= max(0, retry_max):
+            try:
                 ok, err, msg_id = await manager.send_message_to_group(
                     account,
                     group_id=gid,
                     text=message,
                     parse_mode=parse_mode,
                     disable_web_page_preview=disable_web_page_preview,
+                    prepared=prepared,
+                    media=media,
                 )
-                if ok:
-                    break
-                attempt += 1
-                if attempt <= retry_max:
-                    await asyncio.sleep(max(retry_delay_ms, 0) / 1000.0)
-            status = "success" if ok else "failed"
-            if status == "success":
-                success += 1
-            elif status == "failed":
-                failed += 1
-        preview = message[:200]
-        title = str(gid)
-        try:
-            ent = await manager.get(account).client.get_entity(gid)
-            title = getattr(ent, 'title', None) or getattr(ent, 'username', None) or getattr(ent, 'first_name', None) or str(gid)
-        except Exception:
-            title = str(gid)
-        db.add(
-            SendLog(
-                account_name=account,
-                group_id=gid,
-                group_title=title,
-                message_preview=preview,
-                status=status,
-                error=None if status == "success" else (err or ("" if status == "skipped" else "send_failed")),
-                message_id=msg_id,
-                parse_mode=parse_mode,
-            )
-        )
-        db.commit()
-        if base > 0:
-            jitter = random.uniform(-jitter_pct, jitter_pct) * base
-            wait_ms = max(0.0, base + jitter)
-            await asyncio.sleep(wait_ms / 1000.0)
-    return {"total": total, "success": success, "failed": failed}
\ No newline at end of file
+            except Exception as e:
+                # e.g. ConnectionError/RuntimeError from the client: this
+                # target fails, the others still report their own result
+                ok, err, msg_id = False, str(e) or type(e).__name__, None
+            if ok:
+                break
+            flood_wait_s = flood_wait_seconds(err)
+            if flood_wait_s is not None:
+                return None, flood_wait_s
+            attempt += 1
+            if attempt <= retry_max:
+                await asyncio.sleep(max(retry_delay_ms, 0) / 1000.0)
+        status = "success" if ok else "failed"
+    row = {
+        "account_name": account,
+        "group_id": gid,
+        "group_title": group_titles.title_for(account, gid),
+        "message_preview": message[:200],
+        "status": status,
+        "error": None if status == "success" else (err or ("" if status == "skipped" else "send_failed")),
+        "message_id": msg_id,
+        "parse_mode": parse_mode,
+        "created_at": datetime.now(timezone.utc),
+    }
+    publish_log(row)
+    return row, None
+
+
+# Sends to all targets at once (test sends to a handful of groups); only the
+# per-account rate limiter paces them. SendLog rows are written in one
+# executemany batch.
+async def send_to_groups(
+    manager: MultiTelegramManager,
+    account: str,
+    group_ids: list[int],
+    message: str,
+    parse_mode: str,
+    disable_web_page_preview: bool,
+    retry_max: int = 0,
+    retry_delay_ms: int = 1500,
+    media: Optional[list[dict]] = None,
+):
+    total = len(group_ids)
+    rows: list[dict] = []
+    flood_wait_s = None
+    remaining = 0
+    prepared = prepare_message(message, parse_mode)
+    try:
+        results = await asyncio.gather(*[
+            _send_one(manager, account, gid, message, parse_mode, disable_web_page_preview, retry_max, retry_delay_ms, prepared, media)
+            for gid in group_ids
+        ])
+        for row, fw in results:
+            if fw is not None:
+                flood_wait_s = max(flood_wait_s or 0, fw)
+                remaining += 1
+                continue
+            rows.append(row)
+    finally:
+        _write_send_logs(rows)
+        group_titles.schedule_backfill(manager, account)
+    success = sum(1 for r in rows if r["status"] == "success")
+    failed = sum(1 for r in rows if r["status"] == "failed")
+    resp = {"total": total, "success": success, "failed": failed}
+    if flood_wait_s is not None:
+        resp["flood_wait_s"] = flood_wait_s
+        resp["remaining"] = remaining
+    return resp
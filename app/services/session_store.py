@@ -0,0 +1,282 @@
+import asyncio
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import and_
+from telethon.crypto import AuthKey
+from telethon.sessions import MemorySession
+from telethon.tl.types import PeerUser, PeerChat, PeerChannel
+from telethon.tl.types.updates import State
+from telethon import utils
+from app.config import CONFIG
+from app.database import engine
+from app.models import TgSession, TgEntity
+
+
+_sessions = TgSession.__table__
+_entities = TgEntity.__table__
+_CHUNK = 500
+
+# sessions with changes not yet written, keyed by name
+_DIRTY: dict[str, "DbSession"] = {}
+_timer: Optional[asyncio.TimerHandle] = None
+
+
+def _flush_interval_s() -> float:
+    return max(0, getattr(CONFIG, "SESSION_FLUSH_INTERVAL_MS", 1000)) / 1000.0
+
+
+# Telethon session kept in memory and persisted to the tg_sessions and
+# tg_entities tables. Telethon updates the session on almost every
+# response; here that only marks it dirty, and all dirty sessions are
+# written together in one transaction per flush interval. Disconnecting a
+# client (close()) writes its session immediately.
+class DbSession(MemorySession):
+    def __init__(self, name: str, load: bool = True):
+        super().__init__()
+        self.name = name
+        self._by_id: dict[int, tuple] = {}
+        self._dirty_entities: dict[int, tuple] = {}
+        self._dirty = False
+        if load and not _load(self):
+            # first use: take over the account's .session file if there is one
+            path = _session_path(name)
+            if os.path.isfile(path):
+                _import_file(self, path)
+                self._dirty = True
+                self._dirty_entities = dict(self._by_id)
+                flush(self)
+
+    def _touch(self):
+        self._dirty = True
+        _schedule(self)
+
+    def set_dc(self, dc_id, server_address, port):
+        super().set_dc(dc_id, server_address, port)
+        self._touch()
+
+    @MemorySession.auth_key.setter
+    def auth_key(self, value):
+        self._auth_key = value
+        self._touch()
+
+    @MemorySession.takeout_id.setter
+    def takeout_id(self, value):
+        self._takeout_id = value
+        self._touch()
+
+    def set_update_state(self, entity_id, state):
+        if self._update_states.get(entity_id) == state:
+            return
+        super().set_update_state(entity_id, state)
+        self._touch()
+
+    def process_entities(self, tlo):
+        changed = False
+        for row in self._entities_to_rows(tlo):
+            old = self._by_id.get(row[0])
+            if old is not None:
+                # Telethon also saves bare InputPeers (no username, phone or
+                # name at all); those only refresh the hash. A full entity
+                # replaces the row, so a removed username or name is dropped.
+                if row[2] is None and row[3] is None and row[4] is None:
+                    row = (row[0], row[1], old[2], old[3], old[4])
+                if row == old:
+                    continue
+            self._by_id[row[0]] = row
+            self._dirty_entities[row[0]] = row
+            changed = True
+        if changed:
+            _schedule(self)
+
+    def get_entity_rows_by_id(self, id, exact=True):
+        if exact:
+            ids = (id,)
+        else:
+            ids = (utils.get_peer_id(PeerUser(id)), utils.get_peer_id(PeerChat(id)), utils.get_peer_id(PeerChannel(id)))
+        for i in ids:
+            row = self._by_id.get(i)
+            if row is not None:
+                return row[0], row[1]
+        return None
+
+    def _find(self, index: int, value):
+        return next(((r[0], r[1]) for r in self._by_id.values() if r[index] == value), None)
+
+    def get_entity_rows_by_username(self, username):
+        return self._find(2, username)
+
+    def get_entity_rows_by_phone(self, phone):
+        return self._find(3, phone)
+
+    def get_entity_rows_by_name(self, name):
+        return self._find(4, name)
+
+    def save(self):
+        _schedule(self)
+
+    def close(self):
+        flush(self)
+
+    def delete(self):
+        delete_session(self.name)
+        self._by_id.clear()
+        self._dirty_entities.clear()
+        self._dirty = False
+
+
+def _session_path(name: str) -> str:
+    return os.path.join(CONFIG.SESSION_DIR, name + ".session")
+
+
+def _state_to_json(states) -> str:
+    return json.dumps({
+        str(entity_id): [s.pts, s.qts, int(s.date.timestamp()) if s.date else 0, s.seq]
+        for entity_id, s in states
+    })
+
+
+def _state_from_json(raw: Optional[str]) -> dict:
+    states = {}
+    for entity_id, (pts, qts, date, seq) in json.loads(raw or "{}").items():
+        states[int(entity_id)] = State(pts, qts, datetime.fromtimestamp(date, tz=timezone.utc), seq, unread_count=0)
+    return states
+
+
+def _load(s: DbSession) -> bool:
+    with engine.connect() as conn:
+        row = conn.execute(_sessions.select().where(_sessions.c.session_name == s.name)).first()
+        if row is None:
+            return False
+        ents = conn.execute(_entities.select().where(_entities.c.session_name == s.name)).all()
+    s._dc_id = row.dc_id or 0
+    s._server_address = row.server_address
+    s._port = row.port
+    s._auth_key = AuthKey(data=row.auth_key) if row.auth_key else None
+    s._takeout_id = row.takeout_id
+    s._update_states = _state_from_json(row.update_states)
+    s._by_id = {e.id: (e.id, e.hash, e.username, e.phone, e.name) for e in ents}
+    return True
+
+
+# Reads a Telethon SQLite .session file into s (read-only; the file is
+# left as it is).
+def _import_file(s: DbSession, path: str):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        row = conn.execute("select dc_id, server_address, port, auth_key, takeout_id from sessions").fetchone()
+        if row:
+            s._dc_id, s._server_address, s._port = row[0] or 0, row[1], row[2]
+            s._auth_key = AuthKey(data=row[3]) if row[3] else None
+            s._takeout_id = row[4]
+        for r in conn.execute("select id, hash, username, phone, name from entities"):
+            s._by_id[r[0]] = tuple(r)
+        for entity_id, pts, qts, date, seq in conn.execute("select id, pts, qts, date, seq from update_state"):
+            s._update_states[entity_id] = State(pts, qts, datetime.fromtimestamp(date, tz=timezone.utc), seq, unread_count=0)
+    finally:
+        conn.close()
+
+
+def _schedule(s: DbSession):
+    global _timer
+    _DIRTY[s.name] = s
+    if _timer is not None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # no loop (scripts): nothing to coalesce with
+        flush(s)
+        return
+    _timer = loop.call_later(_flush_interval_s(), _on_timer)
+
+
+def _on_timer():
+    global _timer
+    _timer = None
+    flush_all()
+
+
+def flush(s: DbSession):
+    _DIRTY.pop(s.name, None)
+    _write([s])
+
+
+def flush_all():
+    sessions = list(_DIRTY.values())
+    _DIRTY.clear()
+    _write(sessions)
+
+
+def _write(sessions: list[DbSession]):
+    session_rows = []
+    entity_rows: dict[str, list[dict]] = {}
+    for s in sessions:
+        if s._dirty:
+            session_rows.append({
+                "session_name": s.name,
+                "dc_id": s._dc_id,
+                "server_address": s._server_address,
+                "port": s._port,
+                "auth_key": s._auth_key.key if s._auth_key else None,
+                "takeout_id": s._takeout_id,
+                "update_states": _state_to_json(s._update_states.items()),
+                "updated_at": datetime.now(timezone.utc),
+            })
+        if s._dirty_entities:
+            entity_rows[s.name] = [
+                {"session_name": s.name, "id": r[0], "hash": r[1], "username": r[2], "phone": r[3], "name": r[4]}
+                for r in s._dirty_entities.values()
+            ]
+        s._dirty = False
+        s._dirty_entities = {}
+    if not session_rows and not entity_rows:
+        return
+    try:
+        with engine.begin() as conn:
+            if session_rows:
+                conn.execute(_sessions.delete().where(_sessions.c.session_name.in_([r["session_name"] for r in session_rows])))
+                conn.execute(_sessions.insert(), session_rows)
+            for name, rows in entity_rows.items():
+                for i in range(0, len(rows), _CHUNK):
+                    chunk = rows[i:i + _CHUNK]
+                    conn.execute(_entities.delete().where(and_(
+                        _entities.c.session_name == name,
+                        _entities.c.id.in_([r["id"] for r in chunk]),
+                    )))
+                    conn.execute(_entities.insert(), chunk)
+    except Exception:
+        # keep the changes for the next flush
+        for s in sessions:
+            if any(r["session_name"] == s.name for r in session_rows):
+                s._dirty = True
+            for r in entity_rows.get(s.name, ()):
+                s._dirty_entities.setdefault(r["id"], (r["id"], r["hash"], r["username"], r["phone"], r["name"]))
+            _DIRTY[s.name] = s
+
+
+def has_session(name: str) -> bool:
+    with engine.connect() as conn:
+        row = conn.execute(_sessions.select().where(_sessions.c.session_name == name)).first()
+    return bool(row is not None and row.auth_key)
+
+
+def delete_session(name: str):
+    _DIRTY.pop(name, None)
+    with engine.begin() as conn:
+        conn.execute(_sessions.delete().where(_sessions.c.session_name == name))
+        conn.execute(_entities.delete().where(_entities.c.session_name == name))
+
+
+# Copies a .session file into the store, replacing what is stored under
+# that name. Returns the number of entities copied.
+def migrate_file(name: str, path: str) -> int:
+    s = DbSession(name, load=False)
+    _import_file(s, path)
+    s._dirty = True
+    s._dirty_entities = dict(s._by_id)
+    delete_session(name)
+    _write([s])
+    return len(s._by_id)
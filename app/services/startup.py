@@ -0,0 +1,83 @@
+import asyncio
+import importlib
+import time
+from typing import Iterable, Optional
+from app.config import CONFIG
+from app.telegram_client import MultiTelegramManager
+from app.services.account_status import AccountStatusService
+
+
+# Startup progress behind /readyz: the app is ready once the schema is
+# migrated and the accounts that will be used first have been connected
+# (or have failed to connect). Interrupted tasks resume in staggered batches
+# so they do not all open their clients at the same moment.
+class StartupState:
+    def __init__(self, resume_batch: int, resume_stagger_s: float):
+        self.resume_batch = max(1, resume_batch)
+        self.resume_stagger_s = max(0.0, resume_stagger_s)
+        self.started_at = time.monotonic()
+        self.migrated = False
+        self.migrate_error: Optional[str] = None
+        self.warmed = False
+        self.warm_accounts: list[str] = []
+        self.warm_failed: list[str] = []
+        self.resumed = 0
+        self.phases_ms: dict[str, int] = {}
+        self._warmer: Optional[asyncio.Task] = None
+
+    def ready(self) -> bool:
+        return self.migrated and self.warmed
+
+    def mark_phase(self, name: str, since: float):
+        self.phases_ms[name] = int((time.monotonic() - since) * 1000)
+
+    # Delay for the n-th task resumed at startup: batches of resume_batch,
+    # resume_stagger_s apart.
+    def resume_delay_s(self, n: int) -> float:
+        return (n // self.resume_batch) * self.resume_stagger_s
+
+    def warm_order(self, manager: MultiTelegramManager, task_accounts: Iterable[str]) -> list[str]:
+        order: list[str] = []
+        for name in list(task_accounts) + [CONFIG.DEFAULT_ACCOUNT] + list(CONFIG.ACCOUNTS):
+            if name and name not in order:
+                order.append(name)
+        # warming more than the pool holds would only get evicted again
+        return order[:manager.max_connected]
+
+    async def _warm(self, status: AccountStatusService, accounts: list[str]):
+        started = time.monotonic()
+        try:
+            # load Telethon off the event loop so /healthz keeps answering
+            await asyncio.to_thread(importlib.import_module, "telethon")
+            # account_status bounds the concurrency and times out each check
+            states = await status.get_many(accounts, refresh=True)
+            self.warm_failed = [st["account"] for st in states if not st["authorized"]]
+        except Exception:
+            self.warm_failed = list(accounts)
+        finally:
+            self.warmed = True
+            self.mark_phase("warm", started)
+
+    def start_warmup(self, status: AccountStatusService, accounts: list[str]):
+        self.warm_accounts = accounts
+        if self._warmer is None or self._warmer.done():
+            self._warmer = asyncio.get_running_loop().create_task(self._warm(status, accounts))
+
+    def to_dict(self) -> dict:
+        return {
+            "ready": self.ready(),
+            "migrated": self.migrated,
+            "migrate_error": self.migrate_error,
+            "warmed": self.warmed,
+            "warm_accounts": self.warm_accounts,
+            "warm_failed": self.warm_failed,
+            "resumed": self.resumed,
+            "phases_ms": self.phases_ms,
+            "uptime_s": round(time.monotonic() - self.started_at, 1),
+        }
+
+
+startup_state = StartupState(
+    getattr(CONFIG, "STARTUP_RESUME_BATCH", 5),
+    getattr(CONFIG, "STARTUP_RESUME_STAGGER_S", 3.0),
+)
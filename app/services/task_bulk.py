@@ -0,0 +1,272 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine
+from app.models import ScheduledMessage, SendLog, Task
+from app.telegram_client import multi_manager
+from app.services import task_control, peer_store
+from app.services.task_writer import TaskProgressWriter
+from app.services.rate_limiter import rate_limiter
+from app.services.message_prep import prepare_message
+from app.services.task_targets import task_targets, load_round_bitmap, bit_is_set, bit_count
+from app.services.task_runner import _publish, _mark_stopped, slice_sends
+
+
+BULK_KINDS = ("edit", "delete", "schedule_edit", "schedule_cancel")
+# kinds that target ScheduledMessage rows instead of SendLog rows
+SCHEDULE_KINDS = ("schedule_edit", "schedule_cancel")
+# kinds that remove messages, up to 100 ids per chat and call
+# (messages.DeleteMessages / channels.DeleteMessages / DeleteScheduledMessages)
+_DELETE_KINDS = ("delete", "schedule_cancel")
+_DELETE_BATCH = 100
+
+_send_logs = SendLog.__table__
+_scheduled_messages = ScheduledMessage.__table__
+
+
+# Bulk tasks target message rows, not groups: targets_blob holds the ids of
+# the source task's SendLog rows (edit/delete) or ScheduledMessage rows
+# (schedule_*), ordered so one chat's messages are adjacent and can share a
+# delete call.
+def sent_message_log_ids(task_id: str) -> list[int]:
+    db: Session = SessionLocal()
+    try:
+        rows = (
+            db.query(SendLog.id)
+            .filter(
+                SendLog.task_id == task_id,
+                SendLog.status == "success",
+                SendLog.message_id.isnot(None),
+                # still up: never deleted by an earlier bulk task
+                or_(SendLog.followup.is_(None), SendLog.followup != "deleted"),
+            )
+            .order_by(SendLog.account_name, SendLog.group_id, SendLog.message_id)
+            .all()
+        )
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+
+def scheduled_message_ids(task_id: str) -> list[int]:
+    db: Session = SessionLocal()
+    try:
+        rows = (
+            db.query(ScheduledMessage.id)
+            .filter(
+                ScheduledMessage.task_id == task_id,
+                ScheduledMessage.status == "submitted",
+                ScheduledMessage.message_id.isnot(None),
+                ScheduledMessage.schedule_at > datetime.now(timezone.utc),
+            )
+            .order_by(ScheduledMessage.account_name, ScheduledMessage.group_id, ScheduledMessage.round)
+            .all()
+        )
+        return [r.id for r in rows]
+    finally:
+        db.close()
+
+
+def _load_rows(kind: str, ids: list[int]) -> dict[int, SendLog | ScheduledMessage]:
+    model = ScheduledMessage if kind in SCHEDULE_KINDS else SendLog
+    db: Session = SessionLocal()
+    try:
+        found = {}
+        for i in range(0, len(ids), 500):
+            for r in db.query(model).filter(model.id.in_(ids[i:i + 500])).all():
+                found[r.id] = r
+        return found
+    finally:
+        db.close()
+
+
+def _mark_followup(log_ids: list[int], followup: str):
+    with engine.begin() as conn:
+        conn.execute(_send_logs.update().where(_send_logs.c.id.in_(log_ids)).values(followup=followup))
+
+
+def _mark_scheduled(ids: list[int], status: str):
+    with engine.begin() as conn:
+        conn.execute(_scheduled_messages.update().where(_scheduled_messages.c.id.in_(ids)).values(status=status))
+
+
+def _units(kind: str, pending: list[tuple[int, int]], logs: dict[int, SendLog]):
+    units: list[tuple[tuple[str, int], list]] = []
+    missing = []
+    for idx, log_id in pending:
+        r = logs.get(log_id)
+        if r is None:
+            missing.append(idx)
+            continue
+        key = (r.account_name, r.group_id)
+        if kind in _DELETE_KINDS and units and units[-1][0] == key and len(units[-1][1]) < _DELETE_BATCH:
+            units[-1][1].append((idx, r))
+        else:
+            units.append((key, [(idx, r)]))
+    return units, missing
+
+
+# Nothing is recorded for the unit; the slice ends and is retried once the
+# client is back.
+def _reconnecting(writer: TaskProgressWriter, acm, gid: int, e: Exception) -> float:
+    writer.add_event("reconnecting", f"connection_unavailable: {e}", {"gid": gid})
+    writer.flush()
+    return max(1.0, acm.retry_in_s)
+
+
+# Same contract as run_task_slice for bulk tasks: one call per message
+# (edits) or per chat and 100 ids (deletes/cancels), paced by delay_ms and
+# the account limiter, journalled in the round-1 bitmap so a resume skips
+# what is already done.
+async def run_bulk_slice(t: Task) -> Optional[float]:
+    from telethon.errors import FloodWaitError, MessageNotModifiedError
+    from telethon.tl.functions.messages import DeleteScheduledMessagesRequest
+    task_id = t.id
+    kind = t.kind
+    ctrl = task_control.register(task_id, paused=bool(t.paused))
+    if t.stop_requested:
+        ctrl.stop()
+    writer = TaskProgressWriter(task_id)
+    finished = True
+    try:
+        if ctrl.stopped:
+            _mark_stopped(writer)
+            return None
+        log_ids = task_targets(t)
+        total = len(log_ids)
+        bitmap = load_round_bitmap(task_id, 1, total)
+        done = bit_count(bitmap)
+        success = t.success or 0
+        failed = t.failed or 0
+        writer.attach_round(1, bitmap, done)
+        delay = max(t.delay_ms or 0, 0) / 1000.0
+        text = t.message or ""
+        prepared = prepare_message(text, t.parse_mode) if kind in ("edit", "schedule_edit") else None
+        pm = t.parse_mode if t.parse_mode in ("markdown", "html") else None
+
+        writer.set_fields(status="running")
+        if t.status == "queued":
+            writer.add_event("started", "task_started")
+        writer.flush()
+
+        pending = [(idx, log_ids[idx]) for idx in range(total) if not bit_is_set(bitmap, idx)]
+        units, missing = _units(kind, pending, _load_rows(kind, [log_id for _, log_id in pending]))
+        for idx in missing:
+            done += 1
+            failed += 1
+            writer.record_outcome("failed", done, total, idx)
+
+        budget = slice_sends()
+        for (account, gid), items in units:
+            if budget <= 0:
+                writer.flush()
+                finished = False
+                return 0.0
+            budget -= 1
+            if ctrl.paused:
+                writer.flush()
+                finished = False
+                return 0.0
+            if ctrl.stopped:
+                _mark_stopped(writer)
+                return None
+            blocked = rate_limiter.blocked_for(account)
+            if blocked > rate_limiter.max_inline_wait_s:
+                writer.flush()
+                finished = False
+                return blocked
+
+            # outside the per-unit try: reconnecting retries the unit later
+            # and an unauthorized session ends the task, as for sends
+            acm = multi_manager.get(account)
+            try:
+                await acm.ensure_connected()
+            except ConnectionError as e:
+                finished = False
+                return _reconnecting(writer, acm, gid, e)
+            await rate_limiter.acquire(account)
+            err = None
+            try:
+                entity = peer_store.input_peer(account, gid) or gid
+                if kind == "delete":
+                    await acm.client.delete_messages(entity, [r.message_id for _, r in items], revoke=True)
+                elif kind == "schedule_cancel":
+                    await acm.client(DeleteScheduledMessagesRequest(entity, [r.message_id for _, r in items]))
+                else:
+                    # a scheduled message keeps its date; edit_message needs it again
+                    schedule = items[0][1].schedule_at if kind == "schedule_edit" else None
+                    if schedule is not None and schedule.tzinfo is None:
+                        schedule = schedule.replace(tzinfo=timezone.utc)
+                    if prepared is not None:
+                        await acm.client.edit_message(
+                            entity, items[0][1].message_id, prepared[0],
+                            formatting_entities=prepared[1],
+                            link_preview=not t.disable_web_page_preview,
+                            schedule=schedule,
+                        )
+                    else:
+                        await acm.client.edit_message(
+                            entity, items[0][1].message_id, text,
+                            parse_mode=pm,
+                            link_preview=not t.disable_web_page_preview,
+                            schedule=schedule,
+                        )
+            except FloodWaitError as e:
+                seconds = int(getattr(e, "seconds", 0) or 0)
+                rate_limiter.block(account, seconds)
+                writer.add_event("flood_wait", f"flood_wait_{seconds}s", {"gid": gid, "seconds": seconds})
+                writer.flush()
+                finished = False
+                return max(float(seconds), rate_limiter.blocked_for(account))
+            except ConnectionError as e:
+                finished = False
+                return _reconnecting(writer, acm, gid, e)
+            except MessageNotModifiedError:
+                pass
+            except Exception as e:
+                err = str(e) or "request_failed"
+            status = "success" if err is None else "failed"
+            for idx, _ in items:
+                done += 1
+                writer.record_outcome(status, done, total, idx, gid)
+            if err is None:
+                success += len(items)
+                if kind == "schedule_cancel":
+                    _mark_scheduled([r.id for _, r in items], "cancelled")
+                elif kind in ("edit", "delete"):
+                    _mark_followup([r.id for _, r in items], "deleted" if kind == "delete" else "edited")
+            else:
+                failed += len(items)
+            _publish(
+                task_id,
+                "target",
+                round=1,
+                group_id=gid,
+                status=status,
+                error=err,
+                message_ids=[r.message_id for _, r in items],
+                done=done,
+                total=total,
+                success=success,
+                failed=failed,
+            )
+            if await ctrl.sleep(delay):
+                _mark_stopped(writer)
+                return None
+
+        writer.set_fields(status="done", finished_at=datetime.now(timezone.utc))
+        writer.add_event("finished", "task_done")
+        writer.flush()
+        _publish(task_id, "finished", status="done")
+        return None
+    except Exception as e:
+        writer.set_fields(status="error", finished_at=datetime.now(timezone.utc))
+        writer.add_event("error", f"task_error: {e}")
+        writer.flush()
+        _publish(task_id, "finished", status="error", error=str(e))
+        return None
+    finally:
+        if finished:
+            task_control.unregister(task_id)
+        writer.close()
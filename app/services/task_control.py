@@ -0,0 +1,66 @@
+import asyncio
+from typing import Optional
+
+
+class TaskControl:
+    def __init__(self, task_id: str, paused: bool = False):
+        self.task_id = task_id
+        self._running = asyncio.Event()
+        self._stop = asyncio.Event()
+        if not paused:
+            self._running.set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    def pause(self):
+        if not self.stopped:
+            self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def stop(self):
+        self._stop.set()
+        # wake a paused runner so it can observe the stop
+        self._running.set()
+
+    async def wait_resumed(self):
+        await self._running.wait()
+
+    async def sleep(self, seconds: float) -> bool:
+        # returns True when the sleep was cut short by stop()
+        if seconds > 0 and not self.stopped:
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+        return self.stopped
+
+
+_CONTROLS: dict[str, TaskControl] = {}
+
+
+def register(task_id: str, paused: bool = False) -> TaskControl:
+    ctrl = _CONTROLS.get(task_id)
+    if ctrl is None:
+        ctrl = TaskControl(task_id, paused=paused)
+        _CONTROLS[task_id] = ctrl
+    return ctrl
+
+
+def get(task_id: str) -> Optional[TaskControl]:
+    return _CONTROLS.get(task_id)
+
+
+def unregister(task_id: str):
+    _CONTROLS.pop(task_id, None)
+
+
+def active_ids() -> list[str]:
+    return list(_CONTROLS.keys())
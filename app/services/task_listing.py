@@ -0,0 +1,104 @@
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import String, and_, or_, type_coerce
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Task, TaskSummary
+
+
+# started_at is compared as its stored text so the cursor round-trips
+# exactly (server_default rows have no microseconds) and the
+# (started_at, id) index still serves the range scan.
+_started_raw = type_coerce(Task.started_at, String)
+
+
+def encode_cursor(started_at_raw: str, task_id: str) -> str:
+    raw = json.dumps([started_at_raw, task_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    pad = "=" * (-len(cursor) % 4)
+    started_at_raw, task_id = json.loads(base64.urlsafe_b64decode(cursor + pad))
+    return str(started_at_raw), str(task_id)
+
+
+def _time_bound(value: str) -> str:
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    return ts.isoformat() if ts else None
+
+
+def _throughput_per_min(s: Optional[TaskSummary]) -> Optional[float]:
+    if s is None or not s.sends or s.first_send_at is None or s.last_send_at is None:
+        return None
+    span = (s.last_send_at - s.first_send_at).total_seconds()
+    if span <= 0:
+        return None
+    return round(s.sends * 60.0 / span, 2)
+
+
+def list_tasks(
+    status: Optional[str] = None,
+    account: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> dict:
+    limit = max(1, min(limit, 200))
+    db: Session = SessionLocal()
+    try:
+        q = (
+            db.query(Task, TaskSummary, _started_raw.label("started_raw"))
+            .outerjoin(TaskSummary, TaskSummary.task_id == Task.id)
+        )
+        if status:
+            q = q.filter(Task.status.in_([x.strip() for x in status.split(",") if x.strip()]))
+        if account:
+            q = q.filter(Task.account_name == account)
+        if since:
+            q = q.filter(_started_raw >= _time_bound(since))
+        if until:
+            q = q.filter(_started_raw < _time_bound(until))
+        if cursor:
+            c_started, c_id = decode_cursor(cursor)
+            q = q.filter(or_(_started_raw < c_started, and_(_started_raw == c_started, Task.id < c_id)))
+        rows = q.order_by(Task.started_at.desc(), Task.id.desc()).limit(limit + 1).all()
+        items = []
+        for t, summary, _ in rows[:limit]:
+            items.append({
+                "task_id": t.id,
+                "kind": t.kind or "send",
+                "status": t.status,
+                "account": t.account_name,
+                "total": t.total,
+                "success": t.success,
+                "failed": t.failed,
+                "rounds": t.rounds,
+                "current_round": t.current_round,
+                "message_preview": (t.message or "")[:80],
+                "started_at": _iso(t.started_at),
+                "finished_at": _iso(t.finished_at),
+                "summary": {
+                    "sends": summary.sends if summary else 0,
+                    "throughput_per_min": _throughput_per_min(summary),
+                    "failure_reasons": json.loads(summary.failure_reasons_json or "{}") if summary else {},
+                    "last_error": summary.last_error if summary else None,
+                    "last_send_at": _iso(summary.last_send_at) if summary else None,
+                },
+            })
+        next_cursor = None
+        if len(rows) > limit:
+            last_task, _, last_raw = rows[limit - 1]
+            next_cursor = encode_cursor(last_raw, last_task.id)
+        return {"items": items, "next_cursor": next_cursor}
+    finally:
+        db.close()
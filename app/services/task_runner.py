@@ -0,0 +1,282 @@
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.config import CONFIG
+from app.database import SessionLocal
+from app.models import Task
+from app.telegram_client import multi_manager
+from app.services import task_control, group_titles, link_preview
+from app.services.task_writer import TaskProgressWriter
+from app.services.events import hub, task_topic
+from app.services.rate_limiter import rate_limiter, flood_wait_seconds
+from app.services.message_prep import prepare_message
+from app.services.media_store import load_media
+from app.services.link_preview import prefetch_preview, has_link
+from app.services.scheduled_messages import schedule_later_rounds, scheduled_counts, pending_rounds, submit_pending_round
+from app.services.task_targets import task_targets, load_round_bitmap, bit_is_set, bit_count
+
+
+def _publish(task_id: str, event_type: str, **data):
+    hub.publish(task_topic(task_id), {"type": event_type, "task_id": task_id, **data})
+
+
+def _mark_stopped(writer: TaskProgressWriter):
+    writer.set_fields(status="stopped", finished_at=datetime.now(timezone.utc))
+    writer.add_event("stopped", "task_stopped")
+    writer.flush()
+    _publish(writer.task_id, "finished", status="stopped")
+
+
+def _load_task(task_id: str) -> Optional[Task]:
+    db: Session = SessionLocal()
+    try:
+        return db.query(Task).filter(Task.id == task_id).first()
+    finally:
+        db.close()
+
+
+def slice_sends() -> int:
+    return max(1, getattr(CONFIG, "SCHEDULER_SLICE_SENDS", 50))
+
+
+def seconds_until(ts: Optional[datetime]) -> float:
+    if ts is None:
+        return 0.0
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return max(0.0, (ts - datetime.now(timezone.utc)).total_seconds())
+
+
+# Runs the current round of a task from its persisted position, at most
+# slice_sends() targets at a time. Returns the number of seconds after which
+# the scheduler should run the next slice, or None once the task has reached
+# a final state.
+async def run_task_slice(task_id: str) -> Optional[float]:
+    t = _load_task(task_id)
+    if not t or t.status not in ("queued", "running"):
+        task_control.unregister(task_id)
+        return None
+    if (t.kind or "send") != "send":
+        # imported here: task_bulk builds on this module's helpers
+        from app.services.task_bulk import run_bulk_slice
+        return await run_bulk_slice(t)
+    ctrl = task_control.register(task_id, paused=bool(t.paused))
+    if t.stop_requested:
+        ctrl.stop()
+    writer = TaskProgressWriter(task_id)
+    finished = True
+    try:
+        if ctrl.stopped:
+            _mark_stopped(writer)
+            return None
+        account = t.account_name
+        message = t.message or ""
+        parse_mode = t.parse_mode
+        disable_web_page_preview = bool(t.disable_web_page_preview)
+        group_ids = task_targets(t)
+        total = len(group_ids)
+        rounds = max(1, t.rounds or 1)
+        round_interval_s = max(0, t.round_interval_s or 0)
+        native_schedule = bool(t.native_schedule) and rounds > 1
+        current_round = max(1, t.current_round or 1)
+        legacy_done = 0 if t.targets_blob else (t.current_index or 0)
+        bitmap = load_round_bitmap(task_id, current_round, total, legacy_done=legacy_done)
+        done = bit_count(bitmap)
+        success = t.success or 0
+        failed = t.failed or 0
+        writer.attach_round(current_round, bitmap, done)
+        delay = max(t.delay_ms or 0, 0) / 1000.0
+        prepared = prepare_message(message, parse_mode)
+        media = load_media(json.loads(t.media_json)) if t.media_json else None
+
+        writer.set_fields(status="running", current_round=current_round, next_round_at=None)
+        if t.status == "queued":
+            writer.add_event("started", "task_started")
+        writer.flush()
+        preview_url = t.preview_url if t.preview_state == "ready" else None
+        if preview_url is None and t.preview_state != "failed" and not disable_web_page_preview and not media:
+            preview_text, preview_entities = prepared or (message, None)
+            if has_link(preview_text, preview_entities) and link_preview.prefetch_due(task_id):
+                writer.set_fields(preview_state="pending")
+                writer.flush()
+                preview_state, preview_url = await prefetch_preview(multi_manager, account, preview_text, preview_entities)
+                writer.set_fields(preview_state=preview_state, preview_url=preview_url)
+                writer.add_event("preview", f"link_preview_{preview_state}", {"url": preview_url})
+                writer.flush()
+                _publish(task_id, "preview", state=preview_state, url=preview_url)
+
+        budget = slice_sends()
+        for idx in range(total):
+            if bit_is_set(bitmap, idx):
+                continue
+            gid = group_ids[idx]
+            if budget <= 0:
+                # give the worker to the next task; the delay was already slept
+                writer.flush()
+                finished = False
+                return 0.0
+            budget -= 1
+            if ctrl.paused:
+                # hand the worker back; the scheduler re-runs us on resume
+                writer.flush()
+                finished = False
+                return 0.0
+            if ctrl.stopped:
+                _mark_stopped(writer)
+                return None  # Stop the entire task
+            blocked = rate_limiter.blocked_for(account)
+            if blocked > rate_limiter.max_inline_wait_s:
+                # account is parked by a flood wait; retry this target later
+                writer.flush()
+                finished = False
+                return blocked
+
+            try:
+                ok, err, msg_id = await multi_manager.send_message_to_group(
+                    account,
+                    group_id=gid,
+                    text=message,
+                    parse_mode=parse_mode,
+                    disable_web_page_preview=disable_web_page_preview,
+                    prepared=prepared,
+                    media=media,
+                    preview_url=preview_url,
+                )
+            except ConnectionError as e:
+                # still reconnecting after CONNECT_WAIT_S; retry this target later
+                writer.add_event("reconnecting", f"connection_unavailable: {e}", {"gid": gid})
+                writer.flush()
+                finished = False
+                return max(1.0, multi_manager.get(account).retry_in_s)
+            wait_s = flood_wait_seconds(err)
+            if wait_s is not None:
+                writer.add_event("flood_wait", f"flood_wait_{wait_s}s", {"gid": gid, "seconds": wait_s})
+                writer.flush()
+                finished = False
+                return max(float(wait_s), rate_limiter.blocked_for(account))
+            status = "success" if ok else "failed"
+            title = group_titles.title_for(account, gid)
+            if ok and native_schedule:
+                writer.record_scheduled(await schedule_later_rounds(
+                    multi_manager,
+                    task_id,
+                    account,
+                    gid,
+                    datetime.now(timezone.utc),
+                    rounds,
+                    round_interval_s,
+                    text=message,
+                    parse_mode=parse_mode,
+                    disable_web_page_preview=disable_web_page_preview,
+                    prepared=prepared,
+                    media=media,
+                    preview_url=preview_url,
+                ))
+
+            writer.record_send(
+                account,
+                group_id=gid,
+                group_title=title,
+                message=message,
+                status=status,
+                error=None if ok else (err or "send_failed"),
+                message_id=msg_id,
+                parse_mode=parse_mode,
+                current_index=done + 1,
+                total=total,
+                target_index=idx,
+            )
+            done += 1
+            if ok:
+                success += 1
+            else:
+                failed += 1
+            _publish(
+                task_id,
+                "target",
+                round=current_round,
+                index=idx,
+                group_id=gid,
+                group_title=title,
+                status=status,
+                error=None if ok else (err or "send_failed"),
+                message_id=msg_id,
+                done=done,
+                total=total,
+                success=success,
+                failed=failed,
+            )
+
+            if await ctrl.sleep(delay):
+                _mark_stopped(writer)
+                return None
+
+        if native_schedule:
+            # later rounds are queued on Telegram's side, except those a
+            # flood wait kept from going out with their round-1 send
+            writer.flush()
+            for row in pending_rounds(task_id):
+                if budget <= 0 or ctrl.paused:
+                    writer.flush()
+                    finished = False
+                    return 0.0
+                if ctrl.stopped:
+                    _mark_stopped(writer)
+                    return None
+                blocked = rate_limiter.blocked_for(account)
+                if blocked > rate_limiter.max_inline_wait_s:
+                    writer.flush()
+                    finished = False
+                    return blocked
+                budget -= 1
+                try:
+                    wait_s = await submit_pending_round(
+                        multi_manager,
+                        row,
+                        text=message,
+                        parse_mode=parse_mode,
+                        disable_web_page_preview=disable_web_page_preview,
+                        prepared=prepared,
+                        media=media,
+                        preview_url=preview_url,
+                    )
+                except ConnectionError as e:
+                    writer.add_event("reconnecting", f"connection_unavailable: {e}", {"gid": row.group_id})
+                    writer.flush()
+                    finished = False
+                    return max(1.0, multi_manager.get(account).retry_in_s)
+                if wait_s is not None:
+                    writer.add_event("flood_wait", f"flood_wait_{wait_s}s", {"gid": row.group_id, "round": row.round, "seconds": wait_s})
+                    writer.flush()
+                    finished = False
+                    return max(float(wait_s), rate_limiter.blocked_for(account))
+            writer.add_event("scheduled", "rounds_scheduled", scheduled_counts(task_id))
+        elif current_round < rounds:
+            writer.set_fields(
+                current_round=current_round + 1,
+                current_index=0, # Reset index for each round
+                next_round_at=datetime.now(timezone.utc) + timedelta(seconds=round_interval_s),
+            )
+            writer.flush()
+            finished = False
+            _publish(task_id, "round", round=current_round + 1, rounds=rounds, next_round_in_s=round_interval_s)
+            return float(round_interval_s)
+
+        writer.set_fields(status="done", finished_at=datetime.now(timezone.utc))
+        writer.add_event("finished", "task_done")
+        writer.flush()
+        _publish(task_id, "finished", status="done")
+        return None
+    except Exception as e:
+        writer.set_fields(status="error", finished_at=datetime.now(timezone.utc))
+        writer.add_event("error", f"task_error: {e}")
+        writer.flush()
+        _publish(task_id, "finished", status="error", error=str(e))
+        return None
+    finally:
+        if finished:
+            task_control.unregister(task_id)
+            link_preview.forget(task_id)
+        writer.close()
+        group_titles.schedule_backfill(multi_manager, t.account_name)
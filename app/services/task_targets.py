@@ -0,0 +1,88 @@
+import json
+import sys
+from array import array
+from typing import Iterable
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Task, TaskRound
+
+
+# Targets are stored as a packed little-endian int64 array and each round's
+# outcomes as a bitmap (bit i set = target i done), so resuming a task
+# never parses a JSON list.
+
+def pack_targets(group_ids: Iterable[int]) -> bytes:
+    arr = array("q", (int(g) for g in group_ids))
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def unpack_targets(blob: bytes) -> array:
+    arr = array("q")
+    arr.frombytes(blob or b"")
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def task_targets(t: Task) -> array:
+    if t.targets_blob:
+        return unpack_targets(t.targets_blob)
+    # tasks created before targets_blob existed
+    return array("q", (int(g) for g in json.loads(t.group_ids_json or "[]")))
+
+
+def new_bitmap(total: int) -> bytearray:
+    return bytearray((total + 7) // 8)
+
+
+def bit_is_set(bitmap: bytearray, idx: int) -> bool:
+    return bool(bitmap[idx >> 3] & (1 << (idx & 7)))
+
+
+def set_bit(bitmap: bytearray, idx: int):
+    bitmap[idx >> 3] |= 1 << (idx & 7)
+
+
+def bit_count(bitmap: bytearray) -> int:
+    return sum(bin(b).count("1") for b in bitmap)
+
+
+def load_round_bitmap(task_id: str, round_no: int, total: int, legacy_done: int = 0) -> bytearray:
+    db: Session = SessionLocal()
+    try:
+        row = (
+            db.query(TaskRound)
+            .filter(TaskRound.task_id == task_id, TaskRound.round == round_no)
+            .first()
+        )
+        if row is not None and row.bitmap is not None:
+            bitmap = bytearray(row.bitmap)
+            if len(bitmap) < (total + 7) // 8:
+                bitmap.extend(b"\x00" * ((total + 7) // 8 - len(bitmap)))
+            return bitmap
+        bitmap = new_bitmap(total)
+        # rounds started before the journal existed only know a prefix index
+        for i in range(min(max(0, legacy_done), total)):
+            set_bit(bitmap, i)
+        db.add(TaskRound(task_id=task_id, round=round_no, bitmap=bytes(bitmap), done=bit_count(bitmap)))
+        db.commit()
+        return bitmap
+    finally:
+        db.close()
+
+
+def round_progress(task_id: str) -> list[dict]:
+    db: Session = SessionLocal()
+    try:
+        rows = (
+            db.query(TaskRound.round, TaskRound.done)
+            .filter(TaskRound.task_id == task_id)
+            .order_by(TaskRound.round.asc())
+            .all()
+        )
+        return [{"round": r.round, "done": r.done or 0} for r in rows]
+    finally:
+        db.close()
+
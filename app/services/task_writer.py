@@ -0,0 +1,272 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Optional
+from app.database import engine
+from app.models import SendLog, Task, TaskEvent, TaskRound, TaskSummary, ScheduledMessage
+from app.services.task_targets import set_bit
+from app.services.events import publish_log
+from app.config import CONFIG
+
+
+_WRITERS: dict[str, "TaskProgressWriter"] = {}
+
+_send_logs = SendLog.__table__
+_task_events = TaskEvent.__table__
+_tasks = Task.__table__
+_task_rounds = TaskRound.__table__
+_task_summaries = TaskSummary.__table__
+_scheduled_messages = ScheduledMessage.__table__
+
+
+# Write-behind buffer for one task: SendLog/TaskEvent rows and counter deltas
+# are flushed in one transaction every N sends or T milliseconds. T has to
+# span several sends at the default pacing (SEND_MIN_DELAY_MS), or every
+# send still gets its own commit.
+class TaskProgressWriter:
+    def __init__(self, task_id: str, flush_every: Optional[int] = None, flush_interval_ms: Optional[int] = None):
+        self.task_id = task_id
+        if flush_every is None:
+            flush_every = getattr(CONFIG, "TASK_FLUSH_EVERY", 20)
+        if flush_interval_ms is None:
+            flush_interval_ms = getattr(CONFIG, "TASK_FLUSH_INTERVAL_MS", 5000)
+        self.flush_every = max(1, int(flush_every))
+        self.flush_interval_s = max(0, int(flush_interval_ms)) / 1000.0
+        self._logs: list[dict] = []
+        self._events: list[dict] = []
+        self._scheduled: list[dict] = []
+        self._fields: dict = {}
+        self._success = 0
+        self._failed = 0
+        self._pending_sends = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._round: Optional[int] = None
+        self._bitmap: Optional[bytearray] = None
+        self._round_done = 0
+        self._bitmap_dirty = False
+        _WRITERS[task_id] = self
+
+    def attach_round(self, round_no: int, bitmap: bytearray, done: int):
+        self._round = round_no
+        self._bitmap = bitmap
+        self._round_done = done
+        self._bitmap_dirty = False
+
+    def record_send(
+        self,
+        account: str,
+        group_id: int,
+        group_title: str,
+        message: str,
+        status: str,
+        error: Optional[str],
+        message_id: Optional[int],
+        parse_mode: Optional[str],
+        current_index: int,
+        total: int,
+        target_index: Optional[int] = None,
+    ):
+        now = datetime.now(timezone.utc)
+        row = {
+            "task_id": self.task_id,
+            "account_name": account,
+            "group_id": group_id,
+            "group_title": group_title,
+            "message_preview": message[:200],
+            "status": status,
+            "error": error,
+            "message_id": message_id,
+            "parse_mode": parse_mode,
+            "created_at": now,
+        }
+        self._logs.append(row)
+        publish_log(row, task_id=self.task_id)
+        self.record_outcome(status, current_index, total, target_index, group_id)
+
+    # Counters, journal bit and progress event for one processed target,
+    # without a SendLog row (bulk edit/delete tasks)
+    def record_outcome(
+        self,
+        status: str,
+        current_index: int,
+        total: int,
+        target_index: Optional[int] = None,
+        group_id: Optional[int] = None,
+    ):
+        if status == "success":
+            self._success += 1
+        elif status == "failed":
+            self._failed += 1
+        self._fields["current_index"] = current_index
+        self._fields["heartbeat_at"] = datetime.now(timezone.utc)
+        if self._bitmap is not None and target_index is not None:
+            set_bit(self._bitmap, target_index)
+            self._round_done += 1
+            self._bitmap_dirty = True
+        self.add_event("progress", f"{current_index}/{total}", {"gid": group_id})
+        self._pending_sends += 1
+        if self._pending_sends >= self.flush_every:
+            self.flush()
+        else:
+            self._arm_timer()
+
+    # ScheduledMessage rows for later rounds submitted alongside a send; call
+    # before record_send so both land in the same flush
+    def record_scheduled(self, rows: list[dict]):
+        self._scheduled.extend(rows)
+        self._arm_timer()
+
+    def add_event(self, event: str, detail: str, meta: Optional[dict] = None):
+        self._events.append({
+            "task_id": self.task_id,
+            "ts": datetime.now(timezone.utc),
+            "event": event,
+            "detail": detail,
+            "meta_json": json.dumps(meta or {}, ensure_ascii=False),
+        })
+        self._arm_timer()
+
+    def set_fields(self, **fields):
+        self._fields.update(fields)
+        self._arm_timer()
+
+    def has_pending(self) -> bool:
+        return bool(self._logs or self._events or self._scheduled or self._fields or self._success or self._failed or self._bitmap_dirty)
+
+    def flush(self):
+        self._cancel_timer()
+        if not self.has_pending():
+            return
+        logs, events, fields = self._logs, self._events, self._fields
+        scheduled = self._scheduled
+        success, failed = self._success, self._failed
+        self._logs, self._events, self._fields = [], [], {}
+        self._scheduled = []
+        self._success = self._failed = self._pending_sends = 0
+        bitmap_dirty, self._bitmap_dirty = self._bitmap_dirty, False
+        values = dict(fields)
+        if success:
+            values["success"] = _tasks.c.success + success
+        if failed:
+            values["failed"] = _tasks.c.failed + failed
+        try:
+            with engine.begin() as conn:
+                if logs:
+                    conn.execute(_send_logs.insert(), logs)
+                if events:
+                    conn.execute(_task_events.insert(), events)
+                if scheduled:
+                    conn.execute(_scheduled_messages.insert(), scheduled)
+                if values:
+                    conn.execute(_tasks.update().where(_tasks.c.id == self.task_id).values(**values))
+                if bitmap_dirty and self._bitmap is not None:
+                    conn.execute(
+                        _task_rounds.update()
+                        .where(_task_rounds.c.task_id == self.task_id, _task_rounds.c.round == self._round)
+                        .values(bitmap=bytes(self._bitmap), done=self._round_done)
+                    )
+                if logs:
+                    _apply_summary(conn, self.task_id, logs)
+        except Exception:
+            # put the batch back so the next flush retries it
+            self._logs = logs + self._logs
+            self._events = events + self._events
+            self._scheduled = scheduled + self._scheduled
+            self._fields = {**fields, **self._fields}
+            self._success += success
+            self._failed += failed
+            self._bitmap_dirty = self._bitmap_dirty or bitmap_dirty
+            raise
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            if _WRITERS.get(self.task_id) is self:
+                del _WRITERS[self.task_id]
+
+    def _arm_timer(self):
+        if self._timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._timer = loop.call_later(self.flush_interval_s, self._on_timer)
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _on_timer(self):
+        self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            self._arm_timer()
+
+
+def failure_reason(error: Optional[str]) -> str:
+    if not error:
+        return "send_failed"
+    if error.startswith("flood_wait"):
+        return "flood_wait"
+    reason = error.split(" (caused by", 1)[0].strip()
+    return reason[:80] or "send_failed"
+
+
+# Folds one flushed batch into the task's summary row so listings never
+# aggregate send_logs/task_events.
+def _apply_summary(conn, task_id: str, logs: list[dict]):
+    sends = len(logs)
+    success = sum(1 for r in logs if r["status"] == "success")
+    failed = sum(1 for r in logs if r["status"] == "failed")
+    reasons: dict[str, int] = {}
+    last_error = None
+    for r in logs:
+        if r["status"] == "failed":
+            key = failure_reason(r["error"])
+            reasons[key] = reasons.get(key, 0) + 1
+            last_error = r["error"] or last_error
+    first_ts = logs[0]["created_at"]
+    last_ts = logs[-1]["created_at"]
+    row = conn.execute(
+        _task_summaries.select().where(_task_summaries.c.task_id == task_id)
+    ).first()
+    if row is None:
+        conn.execute(_task_summaries.insert().values(
+            task_id=task_id,
+            sends=sends,
+            success=success,
+            failed=failed,
+            first_send_at=first_ts,
+            last_send_at=last_ts,
+            failure_reasons_json=json.dumps(reasons, ensure_ascii=False),
+            last_error=last_error,
+        ))
+        return
+    values = {
+        "sends": _task_summaries.c.sends + sends,
+        "success": _task_summaries.c.success + success,
+        "failed": _task_summaries.c.failed + failed,
+        "last_send_at": last_ts,
+    }
+    if row.first_send_at is None:
+        values["first_send_at"] = first_ts
+    if reasons:
+        merged = json.loads(row.failure_reasons_json or "{}")
+        for k, v in reasons.items():
+            merged[k] = merged.get(k, 0) + v
+        values["failure_reasons_json"] = json.dumps(merged, ensure_ascii=False)
+    if last_error:
+        values["last_error"] = last_error
+    conn.execute(_task_summaries.update().where(_task_summaries.c.task_id == task_id).values(**values))
+
+
+def flush_all():
+    for w in list(_WRITERS.values()):
+        try:
+            w.flush()
+        except Exception:
+            pass
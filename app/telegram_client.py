@@ -1,46 +1,244 @@
 import asyncio
-from typing import List, Optional
-from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError, FloodWaitError, PhoneNumberInvalidError
-from telethon.tl.types import Channel, Chat
-from telethon.tl.functions.channels import GetFullChannelRequest
-from telethon.tl.functions.messages import GetFullChatRequest
+import random
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, List, Optional
 from app.config import CONFIG
+from app.services.rate_limiter import rate_limiter
+from app.services import peer_store, media_store
 import os
 
+# Telethon is a large import; it is loaded on first client use (the
+# imports inside the methods below) so the app starts serving without it.
+if TYPE_CHECKING:
+    from telethon import TelegramClient
+
+
+# Called with the account name whenever a client finds its session is no
+# longer authorized, so cached auth state can be dropped.
+_auth_listeners: list[Callable[[str], None]] = []
+
+
+def add_auth_listener(fn: Callable[[str], None]):
+    _auth_listeners.append(fn)
+
+
+# Called with (account, client) for every new client that receives updates,
+# so services can register their event handlers on it.
+_client_hooks: list[Callable[[str, "TelegramClient"], None]] = []
+
+
+def add_client_hook(fn: Callable[[str, "TelegramClient"], None]):
+    _client_hooks.append(fn)
+
+
+# Group list entry for a dialog's entity, or None when it is not a chat or
+# channel the account is still in (users, left, kicked, migrated chats).
+def group_row(e, title: Optional[str]) -> Optional[dict]:
+    from telethon.tl.types import Channel, Chat
+    if isinstance(e, Chat):
+        if e.left or e.deactivated or e.migrated_to is not None:
+            return None
+        return {
+            "id": e.id,
+            "title": title or e.title,
+            "username": None,
+            "is_megagroup": False,
+            "is_channel": False,
+            "member_count": None,
+        }
+    if isinstance(e, Channel):
+        if e.left:
+            return None
+        is_megagroup = bool(getattr(e, "megagroup", False))
+        is_broadcast = bool(getattr(e, "broadcast", False))
+        return {
+            "id": e.id,
+            "title": title or e.title,
+            "username": getattr(e, "username", None),
+            "is_megagroup": is_megagroup,
+            "is_channel": (not is_megagroup) or is_broadcast,
+            "member_count": None,
+        }
+    return None
+
+
+# only_groups keeps basic chats and megagroups, not broadcast channels
+def is_group(row: dict) -> bool:
+    return bool(row["is_megagroup"] or not row["is_channel"])
+
+
+# Connection lifecycle of an account's client:
+#   disconnected -> connecting -> ready | unauthorized
+#   connecting -> backoff (connect failed) -> connecting after a jittered,
+#       exponentially growing delay
+#   ready -> disconnected when the connection drops or the client is closed
+# unauthorized sticks until a login or a status check finds the session
+# authorized again, so sends stop hammering a logged-out session.
+DISCONNECTED = "disconnected"
+CONNECTING = "connecting"
+READY = "ready"
+BACKOFF = "backoff"
+UNAUTHORIZED = "unauthorized"
+
+_BACKOFF_BASE_S = 1.0
+
 
 class AccountClientManager:
-    def __init__(self, session_name: str, api_id: int, api_hash: str):
+    def __init__(self, session_name: str, api_id: int, api_hash: str, account: Optional[str] = None, send_only: bool = False):
         self.session_name = session_name
+        self.account = account or session_name
         self.api_id = api_id
         self.api_hash = api_hash
-        self.client: Optional[TelegramClient] = None
-        self._connected = False
+        self.send_only = send_only
+        self.client: Optional["TelegramClient"] = None
+        self.state = DISCONNECTED
+        self.failures = 0
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+        self._conn_lock = asyncio.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+        self._media_lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+        self.busy = 0
+        self.login_pending = False
 
-    async def ensure_connected(self):
-        if not self._connected:
-            loop = asyncio.get_running_loop()
-            if self.client is None:
-                session_base = os.path.join(CONFIG.SESSION_DIR, self.session_name)
-                self.client = TelegramClient(session_base, self.api_id, self.api_hash, loop=loop)
+    # A send-only client asks Telegram not to push updates at all (every
+    # request goes out wrapped in InvokeWithoutUpdates) and skips catch-up,
+    # so the groups' message traffic is never received, decrypted or cached.
+    # Entities still come back on our own requests.
+    def _new_client(self) -> "TelegramClient":
+        from telethon import TelegramClient
+        if getattr(CONFIG, "SESSION_STORE", "file") == "db":
+            from app.services.session_store import DbSession
+            session = DbSession(self.session_name)
+        else:
+            session = os.path.join(CONFIG.SESSION_DIR, self.session_name)
+        client = TelegramClient(
+            session,
+            self.api_id,
+            self.api_hash,
+            loop=asyncio.get_running_loop(),
+            receive_updates=not self.send_only,
+            catch_up=False,
+        )
+        if not self.send_only:
+            for fn in _client_hooks:
+                try:
+                    fn(self.account, client)
+                except Exception:
+                    pass
+        return client
+
+    def _backoff_s(self) -> float:
+        cap = max(_BACKOFF_BASE_S, getattr(CONFIG, "CONNECT_BACKOFF_MAX_S", 60))
+        delay = min(cap, _BACKOFF_BASE_S * 2 ** min(self.failures - 1, 16))
+        # jitter the upper half so accounts dropped together retry apart
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    # One connect attempt, called with _conn_lock held. Leaves the state at
+    # ready/unauthorized, or backoff (and re-raises) when it fails.
+    async def _connect(self):
+        if self.client is None:
+            self.client = self._new_client()
+        self.state = CONNECTING
+        try:
             await self.client.connect()
             authorized = await self.client.is_user_authorized()
-            if not authorized:
-                raise RuntimeError("Telegram session not authorized")
-            self._connected = True
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e) or type(e).__name__
+            self.retry_at = time.monotonic() + self._backoff_s()
+            self.state = BACKOFF
+            raise
+        self.failures = 0
+        self.last_error = None
+        self._watch(self.client)
+        if authorized:
+            self.state = READY
+        else:
+            self._auth_lost()
+
+    # Notices a connection Telethon gave up reconnecting, so the next use
+    # reconnects instead of sending through a dead client.
+    def _watch(self, client):
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+        async def watch():
+            try:
+                await client.disconnected
+            except Exception:
+                pass
+            if self.client is client and self.state == READY:
+                self.state = DISCONNECTED
+
+        self._watcher = asyncio.get_running_loop().create_task(watch())
+
+    # Waits (up to CONNECT_WAIT_S) for the client to be ready, reconnecting
+    # with backoff, so a short outage delays sends instead of failing them.
+    async def ensure_connected(self):
+        if self.state == READY and self.connected:
+            return
+        deadline = time.monotonic() + max(0, getattr(CONFIG, "CONNECT_WAIT_S", 30))
+        async with self._conn_lock:
+            while not (self.state == READY and self.connected):
+                if self.state == UNAUTHORIZED:
+                    raise RuntimeError("Telegram session not authorized")
+                wait = self.retry_at - time.monotonic()
+                if wait > 0:
+                    if time.monotonic() + wait > deadline:
+                        raise ConnectionError(f"reconnecting in {wait:.0f}s: {self.last_error}")
+                    await asyncio.sleep(wait)
+                try:
+                    await self._connect()
+                except Exception as e:
+                    if time.monotonic() >= deadline:
+                        raise ConnectionError(f"connect failed: {self.last_error}") from e
+
+    def _auth_lost(self):
+        self.state = UNAUTHORIZED
+        for fn in _auth_listeners:
+            try:
+                fn(self.account)
+            except Exception:
+                pass
 
+    @property
+    def connected(self) -> bool:
+        return self.client is not None and self.client.is_connected()
+
+    @property
+    def retry_in_s(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic()) if self.state == BACKOFF else 0.0
+
+    # Disconnects (Telethon saves and closes the session file) and drops
+    # the client with its entity cache; the next ensure_connected builds a
+    # fresh one from the session file. Waits for a connect in progress
+    # (_conn_lock) and stops the watcher first, so neither touches the
+    # client after it is dropped.
+    async def close(self):
+        async with self._conn_lock:
+            watcher, self._watcher = self._watcher, None
+            if watcher is not None:
+                watcher.cancel()
+                await asyncio.gather(watcher, return_exceptions=True)
+            client, self.client = self.client, None
+            self.state = DISCONNECTED
+            if client is not None:
+                await client.disconnect()
+
+    # Connected client, authorized or not (login and status checks)
     async def _ensure_client(self):
-        loop = asyncio.get_running_loop()
-        if self.client is None:
-            session_base = os.path.join(CONFIG.SESSION_DIR, self.session_name)
-            self.client = TelegramClient(session_base, self.api_id, self.api_hash, loop=loop)
-        await self.client.connect()
+        async with self._conn_lock:
+            if not self.connected:
+                await self._connect()
 
     async def send_login_code(self, phone: str, force_sms: bool = False):
-        loop = asyncio.get_running_loop()
+        from telethon.errors import FloodWaitError, PhoneNumberInvalidError
         if self.client is None:
-            session_base = os.path.join(CONFIG.SESSION_DIR, self.session_name)
-            self.client = TelegramClient(session_base, self.api_id, self.api_hash, loop=loop)
+            self.client = self._new_client()
         # ensure a fresh connection
         await self.client.connect()
         # if connection dropped, reconnect
@@ -49,6 +247,8 @@ class AccountClientManager:
         try:
             resp = await self.client.send_code_request(phone, force_sms=force_sms)
             print(resp)
+            # the code hash lives on this client until confirm_login
+            self.login_pending = True
             return {"ok": True}
         except FloodWaitError as e:
             return {"ok": False, "retry_after": getattr(e, "seconds", 60)}
@@ -65,16 +265,21 @@ class AccountClientManager:
                         except Exception:
                             pass
                     await self.client.disconnect()
-                    self.client = TelegramClient(sb, self.api_id, self.api_hash, loop=loop)
+                    if getattr(CONFIG, "SESSION_STORE", "file") == "db":
+                        from app.services.session_store import delete_session
+                        delete_session(self.session_name)
+                    self.client = self._new_client()
                     await self.client.connect()
                     resp = await self.client.send_code_request(phone, force_sms=force_sms)
                     print(resp)
+                    self.login_pending = True
                     return {"ok": True}
                 except Exception as e2:
                     return {"ok": False, "error": str(e2)}
             return {"ok": False, "error": msg or "send_code_failed"}
 
     async def confirm_login(self, phone: str, code: str, password: str | None = None):
+        from telethon.errors import SessionPasswordNeededError
         await self._ensure_client()
         try:
             await self.client.sign_in(phone=phone, code=code)
@@ -83,12 +288,38 @@ class AccountClientManager:
                 raise
             await self.client.sign_in(password=password)
         me = await self.client.get_me()
-        self._connected = True
+        self.state = READY
+        self.login_pending = False
         return {"id": getattr(me, "id", None)}
 
     async def is_authorized(self) -> bool:
         await self._ensure_client()
-        return await self.client.is_user_authorized()
+        authorized = await self.client.is_user_authorized()
+        if authorized:
+            self.state = READY
+        elif self.state != UNAUTHORIZED:
+            self._auth_lost()
+        return authorized
+
+    # Participant count of a group/channel (entity or input peer). Flood
+    # waits are raised so the caller can back off; other errors give None.
+    async def member_count(self, peer) -> Optional[int]:
+        from telethon.errors import FloodWaitError
+        from telethon.tl.types import Channel, Chat, InputPeerChannel, InputPeerChat
+        from telethon.tl.functions.channels import GetFullChannelRequest
+        from telethon.tl.functions.messages import GetFullChatRequest
+        try:
+            if isinstance(peer, (Chat, InputPeerChat)):
+                full = await self.client(GetFullChatRequest(getattr(peer, "chat_id", None) or peer.id))
+            elif isinstance(peer, (Channel, InputPeerChannel)):
+                full = await self.client(GetFullChannelRequest(peer))
+            else:
+                return None
+            return getattr(full.full_chat, "participants_count", None)
+        except FloodWaitError:
+            raise
+        except Exception:
+            return None
 
     async def get_joined_groups(self, only_groups: bool = True) -> List[dict]:
         await self._ensure_client()
@@ -97,77 +328,154 @@ class AccountClientManager:
             return []
         await self.ensure_connected()
         dialogs = await self.client.get_dialogs()
+        peer_store.remember(self.account, (d.entity for d in dialogs))
         result: List[dict] = []
         for d in dialogs:
-            e = d.entity
-            if isinstance(e, Chat):
-                member_count = None
-                if getattr(CONFIG, "GROUP_MEMBER_COUNT_ENABLED", 0):
-                    try:
-                        full = await self.client(GetFullChatRequest(e.id))
-                        member_count = getattr(full.full_chat, "participants_count", None)
-                    except Exception:
-                        member_count = None
-                result.append({
-                    "id": e.id,
-                    "title": d.name,
-                    "username": None,
-                    "is_megagroup": False,
-                    "is_channel": False,
-                    "member_count": member_count,
-                })
-            elif isinstance(e, Channel):
-                is_megagroup = bool(getattr(e, "megagroup", False))
-                is_broadcast = bool(getattr(e, "broadcast", False))
-                if only_groups and not is_megagroup:
-                    continue
-                member_count = None
-                if getattr(CONFIG, "GROUP_MEMBER_COUNT_ENABLED", 0):
-                    try:
-                        full = await self.client(GetFullChannelRequest(e))
-                        member_count = getattr(full.full_chat, "participants_count", None)
-                    except Exception:
-                        member_count = None
-                result.append({
-                    "id": e.id,
-                    "title": d.name,
-                    "username": getattr(e, "username", None),
-                    "is_megagroup": is_megagroup,
-                    "is_channel": (not is_megagroup) or is_broadcast,
-                    "member_count": member_count,
-                })
+            row = group_row(d.entity, d.name)
+            if row is None or (only_groups and not is_group(row)):
+                continue
+            result.append(row)
         return result
 
+    async def _media_handles(self, media: List[dict]) -> list:
+        # one upload per account and file, shared by concurrent sends
+        async with self._media_lock:
+            handles = []
+            for m in media:
+                h = media_store.get_handle(self.account, m["id"])
+                if h is None:
+                    h = await self.client.upload_file(m["path"], file_name=m["filename"])
+                    media_store.set_handle(self.account, m["id"], h)
+                handles.append(h)
+            return handles
+
+    async def _send_media(self, entity, media: List[dict], text: str, parse_mode, formatting_entities, raw_text: str, raw_parse_mode, schedule=None):
+        from telethon.errors import FileReferenceExpiredError, FilePartMissingError
+        from telethon.utils import get_input_media
+        for attempt in range(2):
+            handles = await self._media_handles(media)
+            try:
+                if len(handles) == 1:
+                    sent = [await self.client.send_file(
+                        entity,
+                        handles[0],
+                        caption=text,
+                        parse_mode=parse_mode,
+                        formatting_entities=formatting_entities,
+                        supports_streaming=True,
+                        schedule=schedule,
+                    )]
+                else:
+                    # Telethon parses album captions itself
+                    sent = await self.client.send_file(
+                        entity,
+                        handles,
+                        caption=[raw_text],
+                        parse_mode=raw_parse_mode,
+                        supports_streaming=True,
+                        schedule=schedule,
+                    )
+                break
+            except (FileReferenceExpiredError, FilePartMissingError):
+                media_store.drop_handles(self.account, [m["id"] for m in media])
+                if attempt:
+                    raise
+        for m, msg in zip(media, sent):
+            try:
+                media_store.set_handle(self.account, m["id"], get_input_media(msg.media))
+            except Exception:
+                pass
+        return sent[0]
+
     async def send_message_to_group(
         self,
         group_id: int,
         text: str,
         parse_mode: Optional[str],
         disable_web_page_preview: bool,
+        prepared: Optional[tuple[str, list]] = None,
+        media: Optional[List[dict]] = None,
+        preview_url: Optional[str] = None,
+        schedule: Optional[datetime] = None,
     ) -> tuple[bool, Optional[str], Optional[int]]:
+        from telethon.errors import FloodWaitError, UnauthorizedError, AuthKeyError, ChannelInvalidError, PeerIdInvalidError
+        from telethon.tl.types import InputMediaWebPage
         await self.ensure_connected()
         pm = None
         if parse_mode == "markdown":
             pm = "markdown"
         elif parse_mode == "html":
             pm = "html"
+        raw_text, raw_pm = text, pm
+        formatting_entities = None
+        if prepared is not None:
+            # already parsed once for the whole task (see message_prep)
+            text, formatting_entities = prepared
+            pm = None
+        peer = peer_store.input_peer(self.account, group_id)
+        entity = peer if peer is not None else group_id
         try:
-            msg = await self.client.send_message(
-                entity=group_id,
-                message=text,
-                parse_mode=pm,
-                link_preview=not disable_web_page_preview,
-            )
+            if media:
+                msg = await self._send_media(entity, media, text, pm, formatting_entities, raw_text, raw_pm, schedule)
+            elif preview_url and not disable_web_page_preview:
+                # preview fetched once for the task; attach it instead of
+                # having Telegram build it again for every target
+                msg = await self.client.send_file(
+                    entity,
+                    InputMediaWebPage(preview_url, optional=True),
+                    caption=text,
+                    parse_mode=pm,
+                    formatting_entities=formatting_entities,
+                    schedule=schedule,
+                )
+            else:
+                msg = await self.client.send_message(
+                    entity=entity,
+                    message=text,
+                    parse_mode=pm,
+                    formatting_entities=formatting_entities,
+                    link_preview=not disable_web_page_preview,
+                    schedule=schedule,
+                )
+            if peer is None:
+                peer_store.remember(self.account, [getattr(msg, "chat", None)])
             mid = getattr(msg, 'id', None)
             return True, None, mid
+        except FloodWaitError:
+            raise
+        except (UnauthorizedError, AuthKeyError) as e:
+            self._auth_lost()
+            return False, str(e), None
+        except ConnectionError as e:
+            # not retried here: the message may have gone out. The next
+            # send waits for the reconnect.
+            if not self.connected:
+                self.state = DISCONNECTED
+            return False, str(e), None
+        except (ChannelInvalidError, PeerIdInvalidError) as e:
+            if peer is not None:
+                # stale access hash; let the next send resolve it again
+                peer_store.forget(self.account, group_id)
+            return False, str(e), None
         except Exception as e:
             return False, str(e), None
 
+# Never evict a client used this recently, even above the cap; callers
+# take the client right after get() and may not have awaited it yet.
+_MIN_IDLE_S = 30
+
+
 class MultiTelegramManager:
     def __init__(self, accounts: dict):
         self.managers: dict[str, AccountClientManager] = {}
         for name, cfg in accounts.items():
-            self.managers[name] = AccountClientManager(cfg["session_name"], cfg["api_id"], cfg["api_hash"])
+            self.managers[name] = AccountClientManager(
+                cfg["session_name"], cfg["api_id"], cfg["api_hash"], account=name, send_only=bool(cfg.get("send_only")),
+            )
+        self.max_connected = max(1, getattr(CONFIG, "CLIENT_POOL_MAX", 10))
+        self.idle_s = max(_MIN_IDLE_S, getattr(CONFIG, "CLIENT_IDLE_S", 900))
+        self.evictions = 0
+        self._reaper: Optional[asyncio.Task] = None
 
     def get(self, account: str) -> AccountClientManager:
         if account not in self.managers:
@@ -178,17 +486,129 @@ class MultiTelegramManager:
             api_hash = CONFIG.TG_API_HASH
             if not api_id or not api_hash:
                 raise RuntimeError("TG_API_ID and TG_API_HASH must be configured in .env")
-            self.managers[account] = AccountClientManager(session_name, api_id, api_hash)
-        return self.managers[account]
+            self.managers[account] = AccountClientManager(
+                session_name, api_id, api_hash, account=account, send_only=bool(getattr(CONFIG, "SEND_ONLY", 0)),
+            )
+        acm = self.managers[account]
+        acm.last_used = time.monotonic()
+        if self.connected_count() > self.max_connected:
+            try:
+                asyncio.get_running_loop().create_task(self.shrink())
+            except RuntimeError:
+                pass
+        return acm
+
+    def connected_count(self) -> int:
+        return sum(1 for m in self.managers.values() if m.connected)
+
+    def _evictable(self, min_idle_s: float) -> List[AccountClientManager]:
+        now = time.monotonic()
+        idle = [
+            m for m in self.managers.values()
+            if m.connected and not m.busy and not m.login_pending and now - m.last_used >= min_idle_s
+        ]
+        return sorted(idle, key=lambda m: m.last_used)
+
+    async def _evict(self, acm: AccountClientManager):
+        self.evictions += 1
+        try:
+            await acm.close()
+        except Exception:
+            pass
+
+    # LRU eviction down to max_connected
+    async def shrink(self):
+        over = self.connected_count() - self.max_connected
+        for acm in self._evictable(_MIN_IDLE_S)[:max(0, over)]:
+            await self._evict(acm)
+
+    async def evict_idle(self):
+        for acm in self._evictable(self.idle_s):
+            await self._evict(acm)
+
+    async def _reap(self):
+        while True:
+            await asyncio.sleep(min(60, self.idle_s))
+            await self.evict_idle()
+            await self.shrink()
+
+    def start_reaper(self):
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.get_running_loop().create_task(self._reap())
+
+    async def close_all(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for acm in list(self.managers.values()):
+            try:
+                await acm.close()
+            except Exception:
+                pass
+
+    def pool_stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "max_connected": self.max_connected,
+            "idle_s": self.idle_s,
+            "managers": len(self.managers),
+            "connected": self.connected_count(),
+            "evictions": self.evictions,
+            "accounts": [
+                {
+                    "account": name,
+                    "connected": m.connected,
+                    "state": m.state,
+                    "send_only": m.send_only,
+                    "failures": m.failures,
+                    "retry_in_s": round(m.retry_in_s, 1),
+                    "busy": m.busy,
+                    "idle_s": round(now - m.last_used, 1),
+                }
+                for name, m in sorted(self.managers.items())
+            ],
+        }
 
     async def ensure_connected(self, account: str):
         await self.get(account).ensure_connected()
 
+    # Connected client held for a multi-request job; not evicted meanwhile
+    @asynccontextmanager
+    async def use(self, account: str):
+        acm = self.get(account)
+        acm.busy += 1
+        try:
+            await acm.ensure_connected()
+            yield acm
+        finally:
+            acm.busy -= 1
+            acm.last_used = time.monotonic()
+
     async def get_joined_groups(self, account: str, only_groups: bool = True) -> List[dict]:
-        return await self.get(account).get_joined_groups(only_groups=only_groups)
+        acm = self.get(account)
+        acm.busy += 1
+        try:
+            return await acm.get_joined_groups(only_groups=only_groups)
+        finally:
+            acm.busy -= 1
 
     async def send_message_to_group(self, account: str, *args, **kwargs):
-        return await self.get(account).send_message_to_group(*args, **kwargs)
+        from telethon.errors import FloodWaitError
+        seconds = 0
+        for _ in range(3):
+            await rate_limiter.acquire(account)
+            acm = self.get(account)
+            acm.busy += 1
+            try:
+                return await acm.send_message_to_group(*args, **kwargs)
+            except FloodWaitError as e:
+                seconds = int(getattr(e, "seconds", 0) or 0)
+                rate_limiter.block(account, seconds)
+                if seconds > rate_limiter.max_inline_wait_s:
+                    break
+            finally:
+                acm.busy -= 1
+        return False, f"flood_wait:{seconds}", None
 
     async def send_login_code(self, account: str, phone: str, force_sms: bool = False):
         return await self.get(account).send_login_code(phone, force_sms=force_sms)
@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from app.config import CONFIG
+from app.telegram_client import AccountClientManager
+
+
+def rss_kb() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Connects one account and leaves it idle, measuring what the update
+# stream costs: CPU time and RSS growth while no request of ours is made.
+async def measure(account: str, send_only: bool, seconds: int) -> dict:
+    cfg = CONFIG.ACCOUNTS.get(account) or {"session_name": account, "api_id": int(CONFIG.TG_API_ID), "api_hash": CONFIG.TG_API_HASH}
+    acm = AccountClientManager(cfg["session_name"], cfg["api_id"], cfg["api_hash"], account=account, send_only=send_only)
+    await acm.ensure_connected()
+    # let the connect-time requests settle before measuring
+    await asyncio.sleep(5)
+    rss0, cpu0 = rss_kb(), time.process_time()
+    await asyncio.sleep(seconds)
+    rss1, cpu1 = rss_kb(), time.process_time()
+    await acm.close()
+    return {
+        "mode": "send-only" if send_only else "updates",
+        "idle_s": seconds,
+        "cpu_ms": round((cpu1 - cpu0) * 1000, 1),
+        "cpu_pct": round((cpu1 - cpu0) / seconds * 100, 2),
+        "rss_mb": round(rss1 / 1024, 1),
+        "rss_growth_mb": round((rss1 - rss0) / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--account", default=CONFIG.DEFAULT_ACCOUNT)
+    parser.add_argument("--seconds", type=int, default=300)
+    parser.add_argument("--mode", choices=("both", "updates", "send-only"), default="both")
+    args = parser.parse_args()
+    if args.mode != "both":
+        print(json.dumps(asyncio.run(measure(args.account, args.mode == "send-only", args.seconds))))
+        sys.exit(0)
+    # one process per mode so neither run inherits the other's caches
+    for mode in ("updates", "send-only"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--account", args.account, "--seconds", str(args.seconds), "--mode", mode],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{r['mode']:9s} idle {r['idle_s']}s: {r['cpu_ms']:9.1f} ms CPU ({r['cpu_pct']:.2f}%), RSS {r['rss_mb']} MB (+{r['rss_growth_mb']} MB)")
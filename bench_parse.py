@@ -0,0 +1,41 @@
+import argparse
+import time
+from telethon.extensions import markdown, html
+from app.services.message_prep import prepare_message, _PREPARED
+
+
+SAMPLE_MARKDOWN = (
+    "**限时活动** 今晚 20:00 开始，__名额有限__！\n"
+    "详情请看 [活动页面](https://example.com/promo?src=tg) 或 `PROMO2024`。\n"
+    "```\n规则：每人限领一次\n```\n" * 3
+)
+SAMPLE_HTML = (
+    "<b>限时活动</b> 今晚 20:00 开始，<i>名额有限</i>！<br>"
+    "详情请看 <a href=\"https://example.com/promo?src=tg\">活动页面</a> 或 <code>PROMO2024</code>。"
+    "<pre>规则：每人限领一次</pre>" * 3
+)
+
+
+def bench(parse_mode: str, text: str, sends: int):
+    parser = markdown if parse_mode == "markdown" else html
+    t0 = time.process_time()
+    for _ in range(sends):
+        parser.parse(text)
+    per_send = time.process_time() - t0
+
+    _PREPARED.clear()
+    t0 = time.process_time()
+    for _ in range(sends):
+        prepare_message(text, parse_mode)
+    once = time.process_time() - t0
+    return per_send, once
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sends", type=int, default=1000)
+    args = parser.parse_args()
+    for mode, text in (("markdown", SAMPLE_MARKDOWN), ("html", SAMPLE_HTML)):
+        per_send, once = bench(mode, text, args.sends)
+        print(f"{mode:8s} parse per send: {per_send * 1000:8.2f} ms CPU / {args.sends} sends")
+        print(f"{mode:8s} parse once    : {once * 1000:8.2f} ms CPU / {args.sends} sends (saved {(per_send - once) * 1000:.2f} ms)")
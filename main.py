@@ -4,6 +4,7 @@ from starlette.templating import Jinja2Templates
 from starlette.responses import HTMLResponse, JSONResponse
 from starlette.responses import StreamingResponse, Response
 from starlette.requests import Request
+from starlette.concurrency import run_in_threadpool
 from app.config import CONFIG
 from app.database import Base, engine, SessionLocal
 from sqlalchemy import text
@@ -12,11 +13,26 @@ from sqlalchemy.orm import Session
 from app.models import SendLog, Task, TaskEvent
 from app.services.send_service import send_to_groups
 from app.services.group_service import get_groups, clear_group_cache
+from app.services import group_sync, member_counts
+from app.services import task_control
+from app.services.scheduler import scheduler, SchedulerFull
+from app.services.rate_limiter import rate_limiter
+from app.services.task_runner import seconds_until
+from app.services.task_targets import pack_targets, round_progress
+from app.services.task_listing import list_tasks
+from app.services.message_prep import prepare_message
+from app.services.media_store import save_media, load_media, MAX_ALBUM
+from app.services.task_bulk import sent_message_log_ids, scheduled_message_ids, SCHEDULE_KINDS
+from app.services.account_status import account_status
+from app.services.startup import startup_state
+from app.services.scheduled_messages import validate_native_schedule, scheduled_counts, list_scheduled
+from app.services.task_writer import flush_all as flush_task_writers
+from app.services.events import hub, task_topic, LOGS_TOPIC
 import json
 import time
 import uuid
 import asyncio
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
 app = Starlette()
 
@@ -36,6 +52,15 @@ async def admin_token_middleware(request, call_next):
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
+@app.route("/healthz")
+async def healthz(request: Request):
+    return JSONResponse({"status": "ok"})
+
+@app.route("/readyz")
+async def readyz(request: Request):
+    state = startup_state.to_dict()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
 @app.route("/api/accounts/status")
 async def list_accounts_status(request: Request):
     token = request.headers.get("X-Admin-Token")
@@ -44,14 +69,12 @@ async def list_accounts_status(request: Request):
     count = getattr(CONFIG, "ACCOUNT_COUNT", 20)
     prefix = getattr(CONFIG, "ACCOUNT_PREFIX", "account")
     names = [f"{prefix}_{i:02d}" for i in range(1, count + 1)]
-    data = []
-    for name in names:
-        try:
-            authorized = await multi_manager.is_authorized(name)
-        except Exception:
-            authorized = False
-        data.append({"account": name, "authorized": authorized})
-    return JSONResponse(data)
+    refresh = request.query_params.get("refresh", "false").lower() in ("1", "true", "yes")
+    states = await account_status.get_many(names, refresh=refresh)
+    return JSONResponse([
+        {"account": st["account"], "authorized": st["authorized"], "error": st["error"], "checked_at": st["checked_at"]}
+        for st in states
+    ])
 
 @app.route("/api/groups")
 async def list_groups(request: Request):
@@ -60,19 +83,21 @@ async def list_groups(request: Request):
         return JSONResponse({"detail": "Unauthorized"}, status_code=401)
     only_groups = request.query_params.get("only_groups", "true").lower() != "false"
     account = request.query_params.get("account") or CONFIG.DEFAULT_ACCOUNT
-    refresh = request.query_params.get("refresh", "false").lower() in ("1", "true", "yes")
+    refresh_param = request.query_params.get("refresh", "false").lower()
+    full = refresh_param == "full"
+    refresh = full or refresh_param in ("1", "true", "yes")
     if getattr(CONFIG, "GROUP_CACHE_ENABLED", 1) == 0:
         refresh = True
     try:
-        authorized = await multi_manager.is_authorized(account)
+        authorized = await account_status.is_authorized(account)
     except Exception:
         authorized = False
     if not authorized:
         return JSONResponse({"detail": "session_not_authorized"}, status_code=403)
-    db: Session = SessionLocal()
     try:
-        data = await get_groups(multi_manager, account=account, only_groups=only_groups, refresh=refresh, db=db)
-        return JSONResponse(data)
+        data = await get_groups(multi_manager, account=account, only_groups=only_groups, refresh=refresh, full=full)
+        # counts still being fetched; the panel re-reads the list until 0
+        return JSONResponse(data, headers={"X-Member-Counts-Pending": str(member_counts.pending(account))})
     except asyncio.CancelledError:
         return JSONResponse({"detail": "request_cancelled"}, status_code=499)
     except BaseException as e:
@@ -80,8 +105,14 @@ async def list_groups(request: Request):
         if "not authorized" in msg or "session" in msg:
             return JSONResponse({"detail": "session_not_authorized"}, status_code=403)
         return JSONResponse({"detail": "internal_error"}, status_code=500)
-    finally:
-        db.close()
+
+@app.route("/api/groups/sync")
+async def groups_sync_stats(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    account = request.query_params.get("account") or CONFIG.DEFAULT_ACCOUNT
+    return JSONResponse(group_sync.stats(account))
 
 @app.route("/api/groups/debug")
 async def debug_groups(request: Request):
@@ -163,27 +194,32 @@ async def send(request: Request):
     parse_mode = body.get("parse_mode") or "plain"
     disable_web_page_preview = bool(body.get("disable_web_page_preview", True))
     delay_ms = int(body.get("delay_ms", 1500))
-    retry_max = int(body.get("retry_max", getattr(CONFIG, "SEND_RETRY_MAX", 0)))
-    retry_delay_ms = int(body.get("retry_delay_ms", getattr(CONFIG, "SEND_RETRY_DELAY_MS", 1500)))
     account = body.get("account") or CONFIG.DEFAULT_ACCOUNT
     request_id = body.get("request_id")
     ok, reason = _check_request_guard(token, request_id)
     if not ok:
         return JSONResponse({"detail": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
     try:
-        authorized = await multi_manager.is_authorized(account)
+        authorized = await account_status.is_authorized(account)
     except Exception:
         authorized = False
     if not authorized:
         return JSONResponse({"detail": "session_not_authorized"}, status_code=403)
-    if not group_ids or not message:
+    media, error = _body_media(body, message)
+    if error is not None:
+        return error
+    if not group_ids or not (message or media):
         return JSONResponse({"detail": "group_ids and message required"}, status_code=400)
-    db: Session = SessionLocal()
-    try:
-        resp = await send_to_groups(multi_manager, db, account, group_ids, message, parse_mode, disable_web_page_preview, delay_ms, retry_max, retry_delay_ms)
-        return JSONResponse(resp)
-    finally:
-        db.close()
+    delay_ms = max(delay_ms, getattr(CONFIG, "SEND_MIN_DELAY_MS", 1500))
+    stream = request.query_params.get("stream", "").lower() in ("1", "true", "yes") or "application/x-ndjson" in request.headers.get("accept", "")
+    task_id, error = _create_send_task(account, group_ids, message, parse_mode, disable_web_page_preview, delay_ms, 1, 0, request_id, media=media)
+    if error is not None:
+        return error
+    if not stream:
+        return JSONResponse({"task_id": task_id, "status": "queued"}, status_code=202)
+    # the worker cannot start before this handler yields, so no event is missed
+    q = hub.subscribe(task_topic(task_id))
+    return StreamingResponse(_stream_task_ndjson(task_id, q), media_type="application/x-ndjson")
 
 
 @app.route("/api/test-send", methods=["POST"])
@@ -204,19 +240,52 @@ async def test_send(request: Request):
     if not ok:
         return JSONResponse({"detail": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
     try:
-        authorized = await multi_manager.is_authorized(account)
+        authorized = await account_status.is_authorized(account)
     except Exception:
         authorized = False
     if not authorized:
         return JSONResponse({"detail": "session_not_authorized"}, status_code=403)
-    if not group_ids or not message:
+    media, error = _body_media(body, message)
+    if error is not None:
+        return error
+    if not group_ids or not (message or media):
         return JSONResponse({"detail": "group_ids and message required"}, status_code=400)
-    db: Session = SessionLocal()
-    try:
-        resp = await send_to_groups(multi_manager, db, account, group_ids, message, parse_mode, disable_web_page_preview, 0, retry_max, retry_delay_ms)
-        return JSONResponse(resp)
-    finally:
-        db.close()
+    # answered inline, so only a handful of targets; larger sends go
+    # through /api/send and the scheduler
+    max_targets = max(1, getattr(CONFIG, "TEST_SEND_MAX_TARGETS", 10))
+    if len(group_ids) > max_targets:
+        return JSONResponse({"detail": "too_many_targets", "max_targets": max_targets, "use": "/api/send"}, status_code=400)
+    # a flood wait longer than the limiter waits inline would hold the request open
+    blocked = rate_limiter.blocked_for(account)
+    if blocked > rate_limiter.max_inline_wait_s:
+        return JSONResponse({"detail": "flood_wait", "retry_after_s": int(blocked) + 1}, status_code=429, headers={"Retry-After": str(int(blocked) + 1)})
+    error = _parse_error_response(message, parse_mode)
+    if error is not None:
+        return error
+    resp = await send_to_groups(multi_manager, account, group_ids, message, parse_mode, disable_web_page_preview, retry_max, retry_delay_ms, media=media)
+    return JSONResponse(resp)
+
+
+# Raw request body upload (no multipart), e.g.
+#   curl -X POST --data-binary @a.jpg -H "Content-Type: image/jpeg" "/api/media?filename=a.jpg"
+@app.route("/api/media", methods=["POST"])
+async def upload_media(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    declared = int(request.headers.get("content-length") or 0)
+    if declared > CONFIG.MEDIA_MAX_BYTES:
+        return JSONResponse({"detail": "media_too_large", "max_bytes": CONFIG.MEDIA_MAX_BYTES}, status_code=413)
+    data = await request.body()
+    if not data:
+        return JSONResponse({"detail": "empty body"}, status_code=400)
+    if len(data) > CONFIG.MEDIA_MAX_BYTES:
+        return JSONResponse({"detail": "media_too_large", "max_bytes": CONFIG.MEDIA_MAX_BYTES}, status_code=413)
+    content_type = (request.headers.get("content-type") or "").split(";")[0].strip()
+    if content_type in ("", "application/octet-stream", "application/x-www-form-urlencoded"):
+        content_type = None
+    m = await run_in_threadpool(save_media, data, request.query_params.get("filename") or "", content_type)
+    return JSONResponse({"media_id": m["id"], "filename": m["filename"], "mime_type": m["mime_type"], "size": m["size"]})
 
 
 @app.route("/api/logs")
@@ -243,6 +312,7 @@ async def recent_logs(request: Request):
                 "error": r.error,
                 "message_id": getattr(r, "message_id", None),
                 "parse_mode": getattr(r, "parse_mode", None),
+                "followup": r.followup,
                 "created_at": r.created_at.isoformat() if r.created_at else None,
             }
             for r in rows
@@ -269,7 +339,7 @@ async def export_logs_csv(request: Request):
         from io import StringIO
         buf = StringIO()
         writer = csv.writer(buf)
-        writer.writerow(["id","account_name","group_id","group_title","message_preview","status","error","message_id","parse_mode","created_at"])
+        writer.writerow(["id","account_name","group_id","group_title","message_preview","status","error","message_id","parse_mode","followup","created_at"])
         for r in rows:
             writer.writerow([
                 r.id,
@@ -281,6 +351,7 @@ async def export_logs_csv(request: Request):
                 (r.error or "").replace("\n"," ").strip(),
                 getattr(r, "message_id", None),
                 getattr(r, "parse_mode", None),
+                r.followup or "",
                 r.created_at.isoformat() if r.created_at else "",
             ])
         csv_data = buf.getvalue()
@@ -291,6 +362,7 @@ async def export_logs_csv(request: Request):
 
 
 async def startup_event():
+    started = time.monotonic()
     Base.metadata.create_all(bind=engine)
     try:
         with engine.connect() as conn:
@@ -303,6 +375,15 @@ async def startup_event():
                 conn.execute(text("ALTER TABLE send_logs ADD COLUMN message_id INTEGER"))
             if 'parse_mode' not in names:
                 conn.execute(text("ALTER TABLE send_logs ADD COLUMN parse_mode VARCHAR(16)"))
+            if 'task_id' not in names:
+                conn.execute(text("ALTER TABLE send_logs ADD COLUMN task_id VARCHAR(64)"))
+            if 'followup' not in names:
+                conn.execute(text("ALTER TABLE send_logs ADD COLUMN followup VARCHAR(16)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_send_logs_task_id_status ON send_logs (task_id, status)"))
+
+            cache_cols = conn.execute(text("PRAGMA table_info('group_caches')")).fetchall()
+            if 'sync_json' not in {c[1] for c in cache_cols}:
+                conn.execute(text("ALTER TABLE group_caches ADD COLUMN sync_json TEXT"))
 
             task_cols = conn.execute(text("PRAGMA table_info('tasks')")).fetchall()
             task_names = {c[1] for c in task_cols}
@@ -314,9 +395,27 @@ async def startup_event():
                 conn.execute(text("ALTER TABLE tasks ADD COLUMN round_interval_s INTEGER DEFAULT 0"))
             if 'next_round_at' not in task_names:
                 conn.execute(text("ALTER TABLE tasks ADD COLUMN next_round_at DATETIME"))
+            if 'targets_blob' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN targets_blob BLOB"))
+            if 'media_json' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN media_json TEXT"))
+            if 'preview_state' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN preview_state VARCHAR(16)"))
+            if 'preview_url' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN preview_url TEXT"))
+            if 'native_schedule' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN native_schedule INTEGER DEFAULT 0"))
+            if 'kind' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN kind VARCHAR(16) DEFAULT 'send'"))
+            if 'source_task_id' not in task_names:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN source_task_id VARCHAR(64)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_started_at_id ON tasks (started_at, id)"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_tasks_account_started_at_id ON tasks (account_name, started_at, id)"))
             conn.commit()
-    except Exception:
-        pass
+        startup_state.migrated = True
+    except Exception as e:
+        startup_state.migrate_error = str(e)
+    startup_state.mark_phase("migrate", started)
     try:
         import os as _os
         import shutil as _shutil
@@ -336,20 +435,50 @@ async def startup_event():
     except Exception:
         pass
 
+    try:
+        rate_limiter.load()
+    except Exception:
+        pass
+    scheduler.start()
+    multi_manager.start_reaper()
+    started = time.monotonic()
+    task_accounts: list[str] = []
     db: Session = SessionLocal()
     try:
-        rows = db.query(Task).filter(Task.status == "running").limit(100).all()
+        rows = (
+            db.query(Task)
+            .filter(Task.status.in_(("queued", "running")))
+            .order_by(Task.started_at.asc())
+            .all()
+        )
         for t in rows:
             try:
-                gids = json.loads(t.group_ids_json or "[]")
-                start_idx = max(0, (t.current_index or 0))
-                rem = gids[start_idx:]
-                if rem:
-                    asyncio.create_task(_run_send_task(t.id, t.account_name, rem, t.message, t.parse_mode, bool(t.disable_web_page_preview), t.delay_ms, t.rounds or 1, t.round_interval_s or 0))
+                if t.stop_requested:
+                    t.status = "stopped"
+                    t.finished_at = datetime.now(timezone.utc)
+                    db.commit()
+                    continue
+                delay_s = seconds_until(t.next_round_at)
+                if delay_s <= 0 and not t.paused:
+                    # due now: stagger so the clients don't all connect at once
+                    delay_s = startup_state.resume_delay_s(startup_state.resumed)
+                    startup_state.resumed += 1
+                    task_accounts.append(t.account_name)
+                scheduler.submit(
+                    t.id,
+                    t.account_name,
+                    est_s=_estimate_task_seconds(t.total or 0, t.delay_ms or 0),
+                    delay_s=delay_s,
+                    paused=bool(t.paused),
+                    force=True,
+                )
             except Exception:
                 pass
     finally:
         db.close()
+    startup_state.mark_phase("resume", started)
+    startup_state.start_warmup(account_status, startup_state.warm_order(multi_manager, task_accounts))
+    group_sync.start_reconciler(multi_manager)
 
 
 _REQ_IDS: dict[str, float] = {}
@@ -375,7 +504,14 @@ def _check_request_guard(token: str, request_id: str | None, window_ms: int = 50
     _LAST_TS[token] = now
     return True, None
 
+async def shutdown_event():
+    await scheduler.shutdown()
+    flush_task_writers()
+    await multi_manager.close_all()
+
+
 app.add_event_handler("startup", startup_event)
+app.add_event_handler("shutdown", shutdown_event)
 
 TASKS: dict[str, dict] = {}
 
@@ -396,23 +532,140 @@ async def send_async(request: Request):
     round_interval_s = int(body.get("round_interval_s", 600))
     account = body.get("account") or CONFIG.DEFAULT_ACCOUNT
     request_id = body.get("request_id")
+    native_schedule = bool(body.get("native_schedule", False))
     ok, reason = _check_request_guard(token, request_id)
     if not ok:
         return JSONResponse({"detail": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
     try:
-        authorized = await multi_manager.is_authorized(account)
+        authorized = await account_status.is_authorized(account)
     except Exception:
         authorized = False
     if not authorized:
         return JSONResponse({"detail": "session_not_authorized"}, status_code=403)
-    if not group_ids or not message:
+    media, error = _body_media(body, message)
+    if error is not None:
+        return error
+    if not group_ids or not (message or media):
         return JSONResponse({"detail": "group_ids and message required"}, status_code=400)
+    if native_schedule:
+        schedule_error = validate_native_schedule(rounds, round_interval_s)
+        if schedule_error:
+            return JSONResponse({"detail": schedule_error}, status_code=400)
+    # ?preflight=1 only returns the dry-run plan; ?preflight=drop queues the
+    # task with the targets that passed
+    preflight = request.query_params.get("preflight")
+    plan = None
+    if preflight:
+        try:
+            group_ids = [int(g) for g in group_ids]
+        except (TypeError, ValueError):
+            return JSONResponse({"detail": "group_ids must be integers"}, status_code=400)
+        error = _parse_error_response(message, parse_mode)
+        if error is not None:
+            return error
+        # preflight pulls in Telethon's type tables; only load it when asked
+        from app.services.preflight import preflight_targets
+        try:
+            result = await preflight_targets(multi_manager, account, group_ids)
+        except Exception as e:
+            return JSONResponse({"detail": "preflight_failed", "error": str(e)}, status_code=502)
+        plan = {
+            "total": len(group_ids),
+            "sendable": len(result["sendable"]),
+            "dropped": result["dropped"],
+            "unchecked": result["unchecked"],
+            "expected_duration_s": _plan_duration_s(account, len(result["sendable"]), delay_ms, rounds, round_interval_s),
+        }
+        if preflight != "drop":
+            return JSONResponse({"dry_run": True, **plan, "group_ids": result["sendable"]})
+        group_ids = result["sendable"]
+        if not group_ids:
+            return JSONResponse({"detail": "no_sendable_targets", "preflight": plan}, status_code=400)
+    task_id, error = _create_send_task(account, group_ids, message, parse_mode, disable_web_page_preview, delay_ms, rounds, round_interval_s, request_id, media=media, preflight=plan, native_schedule=native_schedule)
+    if error is not None:
+        return error
+    resp = {"task_id": task_id, "status": "queued", "queue_depth": scheduler.pending()}
+    if plan is not None:
+        resp["preflight"] = plan
+    return JSONResponse(resp)
+
+
+def _plan_duration_s(account: str, sendable: int, delay_ms: int, rounds: int, round_interval_s: int) -> float:
+    # pacing is the larger of the task delay and the account's token rate
+    per_send = max(max(delay_ms, 0) / 1000.0, 1.0 / rate_limiter.rate_per_s)
+    rounds = max(1, rounds)
+    total = rounds * sendable * per_send + (rounds - 1) * max(0, round_interval_s)
+    return round(total + rate_limiter.blocked_for(account), 1)
+
+
+# Telegram's caption limit for non-premium accounts
+_MAX_CAPTION = 1024
+
+
+def _body_media(body: dict, message: str):
+    media_ids = body.get("media") or []
+    if not media_ids:
+        return None, None
+    if not isinstance(media_ids, list) or len(media_ids) > MAX_ALBUM:
+        return None, JSONResponse({"detail": f"media must be a list of at most {MAX_ALBUM} ids"}, status_code=400)
+    if len(message) > _MAX_CAPTION:
+        return None, JSONResponse({"detail": "caption_too_long", "max": _MAX_CAPTION}, status_code=400)
+    try:
+        return load_media([str(m) for m in media_ids]), None
+    except ValueError as e:
+        return None, JSONResponse({"detail": "unknown_media", "error": str(e)}, status_code=400)
+
+
+def _parse_error_response(message: str, parse_mode: str):
+    try:
+        prepare_message(message, parse_mode)
+    except ValueError as e:
+        return JSONResponse({"detail": "parse_error", "error": str(e)}, status_code=400)
+    return None
+
+
+def _queue_unavailable():
+    if not scheduler.started:
+        return JSONResponse({"detail": "scheduler_unavailable"}, status_code=503, headers={"Retry-After": "5"})
+    return None
+
+
+# Admits a new task into the scheduler. Nothing awaits between this and the
+# Task insert that follows, so no worker can pick the job up before its row
+# exists.
+def _submit_or_reject(task_id: str, account: str, est_s: float):
+    try:
+        scheduler.submit(task_id, account, est_s=est_s)
+    except SchedulerFull as e:
+        eta = int(e.eta_s) + 1
+        return JSONResponse(
+            {"detail": "queue_full", "depth": e.depth, "eta_s": eta},
+            status_code=429,
+            headers={"Retry-After": str(eta)},
+        )
+    return None
+
+
+def _create_send_task(account: str, group_ids: list, message: str, parse_mode: str, disable_web_page_preview: bool, delay_ms: int, rounds: int, round_interval_s: int, request_id: str | None, media: list | None = None, preflight: dict | None = None, native_schedule: bool = False):
+    try:
+        targets_blob = pack_targets(group_ids)
+    except (TypeError, ValueError, OverflowError):
+        return None, JSONResponse({"detail": "group_ids must be integers"}, status_code=400)
+    error = _parse_error_response(message, parse_mode)
+    if error is not None:
+        return None, error
+    error = _queue_unavailable()
+    if error is not None:
+        return None, error
     task_id = uuid.uuid4().hex[:24]
+    error = _submit_or_reject(task_id, account, _estimate_task_seconds(len(group_ids), delay_ms))
+    if error is not None:
+        return None, error
     db: Session = SessionLocal()
     try:
         t = Task(
             id=task_id,
-            status="running",
+            status="queued",
             total=len(group_ids),
             success=0,
             failed=0,
@@ -424,16 +677,70 @@ async def send_async(request: Request):
             rounds=rounds,
             round_interval_s=round_interval_s,
             current_index=0,
-            group_ids_json=json.dumps(group_ids),
+            targets_blob=targets_blob,
+            media_json=json.dumps([m["id"] for m in media]) if media else None,
+            native_schedule=1 if native_schedule else 0,
             request_id=request_id,
         )
         db.add(t)
         db.add(TaskEvent(task_id=task_id, event="created", detail="task_created", meta_json=json.dumps({"count": len(group_ids)}, ensure_ascii=False)))
+        if preflight is not None:
+            db.add(TaskEvent(task_id=task_id, event="preflight", detail="preflight_dropped", meta_json=json.dumps(preflight, ensure_ascii=False)))
         db.commit()
     finally:
         db.close()
-    asyncio.create_task(_run_send_task(task_id, account, group_ids, message, parse_mode, disable_web_page_preview, delay_ms, rounds, round_interval_s))
-    return JSONResponse({"task_id": task_id})
+    return task_id, None
+
+
+_FINAL_STATUSES = ("done", "stopped", "error")
+
+
+def _task_summary(task_id: str) -> dict | None:
+    db: Session = SessionLocal()
+    try:
+        t = db.query(Task).filter(Task.id == task_id).first()
+        if not t:
+            return None
+        return {"type": "summary", "task_id": t.id, "status": t.status, "total": t.total, "success": t.success, "failed": t.failed}
+    finally:
+        db.close()
+
+
+async def _stream_task_ndjson(task_id: str, q: asyncio.Queue):
+    topic = task_topic(task_id)
+    try:
+        yield json.dumps({"type": "queued", "task_id": task_id}) + "\n"
+        while True:
+            try:
+                ev = await asyncio.wait_for(q.get(), timeout=15)
+            except asyncio.TimeoutError:
+                summary = _task_summary(task_id)
+                if summary is None or summary["status"] in _FINAL_STATUSES:
+                    if summary is not None:
+                        yield json.dumps(summary, ensure_ascii=False) + "\n"
+                    return
+                yield json.dumps({"type": "heartbeat", "task_id": task_id}) + "\n"
+                continue
+            yield json.dumps(ev, ensure_ascii=False) + "\n"
+            if ev.get("type") == "finished":
+                summary = _task_summary(task_id)
+                if summary is not None:
+                    yield json.dumps(summary, ensure_ascii=False) + "\n"
+                return
+    finally:
+        hub.unsubscribe(topic, q)
+
+
+def _estimate_task_seconds(total: int, delay_ms: int) -> float:
+    return max(0, total) * max(delay_ms, 0) / 1000.0
+
+
+@app.route("/api/scheduler")
+async def scheduler_stats(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    return JSONResponse(scheduler.stats())
 
 
 @app.route("/api/task-status")
@@ -444,13 +751,22 @@ async def task_status(request: Request):
     task_id = request.query_params.get("task_id")
     if not task_id:
         return JSONResponse({"detail": "Not Found"}, status_code=404)
+    data = _task_status_data(task_id)
+    if data is None:
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    return JSONResponse(data)
+
+
+def _task_status_data(task_id: str) -> dict | None:
     db: Session = SessionLocal()
     try:
         t = db.query(Task).filter(Task.id == task_id).first()
         if not t:
-            return JSONResponse({"detail": "Not Found"}, status_code=404)
-        data = {
+            return None
+        return {
             "task_id": t.id,
+            "kind": t.kind or "send",
+            "source_task_id": t.source_task_id,
             "status": t.status,
             "total": t.total,
             "success": t.success,
@@ -462,101 +778,250 @@ async def task_status(request: Request):
             "current_round": t.current_round,
             "round_interval_s": t.round_interval_s,
             "next_round_at": t.next_round_at.isoformat() if t.next_round_at else None,
+            "paused": bool(t.paused),
+            "stop_requested": bool(t.stop_requested),
+            "round_progress": round_progress(t.id),
+            "link_preview": {"state": t.preview_state, "url": t.preview_url} if t.preview_state else None,
+            "native_schedule": bool(t.native_schedule),
+            "scheduled": scheduled_counts(t.id) if t.native_schedule else None,
         }
-        return JSONResponse(data)
     finally:
         db.close()
 
 
-async def _run_send_task(task_id: str, account: str, group_ids: list[int], message: str, parse_mode: str, disable_web_page_preview: bool, delay_ms: int, rounds: int, round_interval_s: int):
-    db: Session = SessionLocal()
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _sse_stream(request: Request, task_id: str | None, q: asyncio.Queue, topics: list[str]):
     try:
-        for i in range(rounds):
-            current_round = i + 1
-            t = db.query(Task).filter(Task.id == task_id).first()
-            if t:
-                t.current_round = current_round
-                t.current_index = 0 # Reset index for each round
-                db.commit()
-
-            delay = max(delay_ms, 0) / 1000.0
-            for idx, gid in enumerate(group_ids):
-                t = db.query(Task).filter(Task.id == task_id).first()
-                if t and t.stop_requested:
-                    t.status = "stopped"
-                    t.finished_at = datetime.now(timezone.utc)
-                    db.add(TaskEvent(task_id=task_id, event="stopped", detail="task_stopped", meta_json=json.dumps({}, ensure_ascii=False)))
-                    db.commit()
-                    return  # Stop the entire task
-
-                while t and t.paused:
-                    await asyncio.sleep(1)
-                    t = db.query(Task).filter(Task.id == task_id).first()
-
-                ok, err, msg_id = await multi_manager.send_message_to_group(
-                    account,
-                    group_id=gid,
-                    text=message,
-                    parse_mode=parse_mode,
-                    disable_web_page_preview=disable_web_page_preview,
-                )
-                status = "success" if ok else "failed"
-                preview = message[:200]
-                title = str(gid)
-                try:
-                    ent = await multi_manager.get(account).client.get_entity(gid)
-                    title = getattr(ent, 'title', None) or getattr(ent, 'username', None) or getattr(ent, 'first_name', None) or str(gid)
-                except Exception:
-                    title = str(gid)
-
-                log = SendLog(
-                    account_name=account,
-                    group_id=gid,
-                    group_title=title,
-                    message_preview=preview,
-                    status=status,
-                    error=None if ok else (err or "send_failed"),
-                    message_id=msg_id,
-                    parse_mode=parse_mode,
-                )
-                db.add(log)
-                t = db.query(Task).filter(Task.id == task_id).first()
-                if t:
-                    if ok:
-                        t.success = (t.success or 0) + 1
-                    else:
-                        t.failed = (t.failed or 0) + 1
-                    t.current_index = (t.current_index or 0) + 1
-                    t.heartbeat_at = datetime.now(timezone.utc)
-                    db.add(TaskEvent(task_id=task_id, event="progress", detail=f"{t.current_index}/{t.total}", meta_json=json.dumps({"gid": gid}, ensure_ascii=False)))
-                db.commit()
-
-                if delay > 0:
-                    await asyncio.sleep(delay)
-
-            if current_round < rounds:
-                t = db.query(Task).filter(Task.id == task_id).first()
-                if t:
-                    t.next_round_at = datetime.now(timezone.utc) + timedelta(seconds=round_interval_s)
-                    db.commit()
-                await asyncio.sleep(round_interval_s)
+        if task_id:
+            snap = _task_status_data(task_id)
+            if snap is None:
+                yield _sse("error", {"detail": "Not Found", "task_id": task_id})
+                return
+            yield _sse("snapshot", snap)
+            if snap["status"] in _FINAL_STATUSES and len(topics) == 1:
+                return
+        while True:
+            if await request.is_disconnected():
+                return
+            try:
+                ev = await asyncio.wait_for(q.get(), timeout=15)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield _sse(ev.get("type", "message"), ev)
+            if task_id and ev.get("type") == "finished" and ev.get("task_id") == task_id:
+                snap = _task_status_data(task_id)
+                if snap is not None:
+                    yield _sse("snapshot", snap)
+                if len(topics) == 1:
+                    return
+    finally:
+        for topic in topics:
+            hub.unsubscribe(topic, q)
 
+
+@app.route("/api/events")
+async def events_stream(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    task_id = request.query_params.get("task_id")
+    want_logs = request.query_params.get("logs", "0").lower() in ("1", "true", "yes")
+    if not task_id and not want_logs:
+        return JSONResponse({"detail": "task_id or logs=1 required"}, status_code=400)
+    topics = []
+    if task_id:
+        topics.append(task_topic(task_id))
+    if want_logs:
+        topics.append(LOGS_TOPIC)
+    q = None
+    for topic in topics:
+        q = hub.subscribe(topic, q)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(_sse_stream(request, task_id, q, topics), media_type="text/event-stream", headers=headers)
+
+
+@app.route("/api/tasks")
+async def list_tasks_route(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    qp = request.query_params
+    try:
+        data = list_tasks(
+            status=qp.get("status"),
+            account=qp.get("account"),
+            since=qp.get("since"),
+            until=qp.get("until"),
+            cursor=qp.get("cursor"),
+            limit=int(qp.get("limit", 50)),
+        )
+    except (ValueError, TypeError):
+        return JSONResponse({"detail": "invalid_query"}, status_code=400)
+    return JSONResponse(data)
+
+
+_TASK_CONTROL_EVENTS = {"pause": "paused", "resume": "resumed", "stop": "stop_requested"}
+
+
+async def _task_control_action(request: Request, action: str):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    task_id = request.path_params.get("task_id")
+    db: Session = SessionLocal()
+    try:
         t = db.query(Task).filter(Task.id == task_id).first()
-        if t and t.status not in ("stopped", "error"):
-            t.status = "done"
-            t.finished_at = datetime.now(timezone.utc)
-            db.add(TaskEvent(task_id=task_id, event="finished", detail="task_done", meta_json=json.dumps({}, ensure_ascii=False)))
-            db.commit()
-    except Exception as e:
-        t = db.query(Task).filter(Task.id == task_id).first()
-        if t:
-            t.status = "error"
-            t.finished_at = datetime.now(timezone.utc)
-            db.add(TaskEvent(task_id=task_id, event="error", detail=f"task_error: {e}", meta_json=json.dumps({}, ensure_ascii=False)))
-            db.commit()
+        if not t:
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        if t.status not in ("queued", "running"):
+            return JSONResponse({"detail": "task_not_running", "status": t.status}, status_code=409)
+        ctrl = task_control.get(task_id)
+        if action == "pause":
+            t.paused = 1
+            if ctrl:
+                ctrl.pause()
+        elif action == "resume":
+            t.paused = 0
+            if ctrl:
+                ctrl.resume()
+        elif action == "stop":
+            t.stop_requested = 1
+            if ctrl:
+                ctrl.stop()
+            else:
+                # no runner in this process; nothing else will finalize it
+                t.status = "stopped"
+                t.finished_at = datetime.now(timezone.utc)
+        db.add(TaskEvent(task_id=task_id, event=_TASK_CONTROL_EVENTS[action], detail=f"task_{action}", meta_json=json.dumps({"live": ctrl is not None}, ensure_ascii=False)))
+        db.commit()
+        if action == "stop" and ctrl is None:
+            hub.publish(task_topic(task_id), {"type": "finished", "task_id": task_id, "status": "stopped"})
+        scheduler.notify()
+        return JSONResponse({"ok": True, "task_id": task_id, "paused": bool(t.paused), "stop_requested": bool(t.stop_requested), "status": t.status})
     finally:
         db.close()
 
+
+@app.route("/api/tasks/{task_id}/pause", methods=["POST"])
+async def pause_task(request: Request):
+    return await _task_control_action(request, "pause")
+
+
+@app.route("/api/tasks/{task_id}/resume", methods=["POST"])
+async def resume_task(request: Request):
+    return await _task_control_action(request, "resume")
+
+
+@app.route("/api/tasks/{task_id}/stop", methods=["POST"])
+async def stop_task(request: Request):
+    return await _task_control_action(request, "stop")
+
+
+# Edit/delete of a finished task's sent messages, or edit/cancel of its
+# submitted scheduled messages, queued as a task of that kind.
+async def _bulk_task_action(request: Request, kind: str):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    source_id = request.path_params["task_id"]
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+    message = (body.get("message") or "").strip()
+    parse_mode = body.get("parse_mode") or "plain"
+    disable_web_page_preview = bool(body.get("disable_web_page_preview", True))
+    delay_ms = max(int(body.get("delay_ms", 1000)), 0)
+    if kind in ("edit", "schedule_edit"):
+        if not message:
+            return JSONResponse({"detail": "message required"}, status_code=400)
+        error = _parse_error_response(message, parse_mode)
+        if error is not None:
+            return error
+    db: Session = SessionLocal()
+    try:
+        source = db.query(Task).filter(Task.id == source_id).first()
+    finally:
+        db.close()
+    if not source or (source.kind or "send") != "send":
+        return JSONResponse({"detail": "Not Found"}, status_code=404)
+    if source.status not in _FINAL_STATUSES:
+        return JSONResponse({"detail": "task_not_finished", "status": source.status}, status_code=409)
+    if kind in SCHEDULE_KINDS:
+        log_ids = scheduled_message_ids(source_id)
+        if not log_ids:
+            return JSONResponse({"detail": "no_scheduled_messages"}, status_code=400)
+    else:
+        log_ids = sent_message_log_ids(source_id)
+        if not log_ids:
+            return JSONResponse({"detail": "no_sent_messages"}, status_code=400)
+    error = _queue_unavailable()
+    if error is not None:
+        return error
+    task_id = uuid.uuid4().hex[:24]
+    error = _submit_or_reject(task_id, source.account_name, _estimate_task_seconds(len(log_ids), delay_ms))
+    if error is not None:
+        return error
+    db = SessionLocal()
+    try:
+        db.add(Task(
+            id=task_id,
+            kind=kind,
+            source_task_id=source_id,
+            status="queued",
+            total=len(log_ids),
+            success=0,
+            failed=0,
+            account_name=source.account_name,
+            message=message if kind in ("edit", "schedule_edit") else None,
+            parse_mode=parse_mode,
+            disable_web_page_preview=1 if disable_web_page_preview else 0,
+            delay_ms=delay_ms,
+            rounds=1,
+            round_interval_s=0,
+            current_index=0,
+            targets_blob=pack_targets(log_ids),
+        ))
+        db.add(TaskEvent(task_id=task_id, event="created", detail=f"{kind}_task_created", meta_json=json.dumps({"source_task_id": source_id, "count": len(log_ids)}, ensure_ascii=False)))
+        db.commit()
+    finally:
+        db.close()
+    return JSONResponse({"task_id": task_id, "kind": kind, "source_task_id": source_id, "status": "queued", "total": len(log_ids)}, status_code=202)
+
+
+@app.route("/api/tasks/{task_id}/edit", methods=["POST"])
+async def task_edit_messages(request: Request):
+    return await _bulk_task_action(request, "edit")
+
+
+@app.route("/api/tasks/{task_id}/delete", methods=["POST"])
+async def task_delete_messages(request: Request):
+    return await _bulk_task_action(request, "delete")
+
+
+@app.route("/api/tasks/{task_id}/schedule")
+async def task_schedule(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    task_id = request.path_params["task_id"]
+    return JSONResponse({"task_id": task_id, "items": list_scheduled(task_id)})
+
+
+@app.route("/api/tasks/{task_id}/schedule/cancel", methods=["POST"])
+async def task_schedule_cancel(request: Request):
+    return await _bulk_task_action(request, "schedule_cancel")
+
+
+@app.route("/api/tasks/{task_id}/schedule/edit", methods=["POST"])
+async def task_schedule_edit(request: Request):
+    return await _bulk_task_action(request, "schedule_edit")
+
+
 @app.route("/api/login/send-code", methods=["POST"])
 async def login_send_code(request: Request):
     token = request.headers.get("X-Admin-Token")
@@ -588,19 +1053,39 @@ async def login_submit_code(request: Request):
         return JSONResponse({"detail": "phone and code required"}, status_code=400)
     try:
         resp = await multi_manager.confirm_login(account, phone, code, body.get("password") or None)
+        account_status.invalidate(account)
         return JSONResponse(resp)
     except Exception as e:
         return JSONResponse({"detail": str(e)}, status_code=500)
 
 
 @app.route("/api/account-status")
-async def account_status(request: Request):
+async def get_account_status(request: Request):
     token = request.headers.get("X-Admin-Token")
     if token != CONFIG.ADMIN_TOKEN:
         return JSONResponse({"detail": "Unauthorized"}, status_code=401)
     account = request.query_params.get("account") or CONFIG.DEFAULT_ACCOUNT
+    limits = rate_limiter.status(account)
     try:
-        authorized = await multi_manager.is_authorized(account)
-        return JSONResponse({"authorized": authorized})
+        authorized = await account_status.is_authorized(account)
+        return JSONResponse({"authorized": authorized, "next_send_at": limits["next_send_at"], "blocked_until": limits["blocked_until"]})
     except Exception as e:
-        return JSONResponse({"authorized": False, "detail": str(e)})
+        return JSONResponse({"authorized": False, "detail": str(e), "next_send_at": limits["next_send_at"], "blocked_until": limits["blocked_until"]})
+
+
+@app.route("/api/client-pool")
+async def client_pool(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    return JSONResponse(multi_manager.pool_stats())
+
+
+@app.route("/api/rate-limits")
+async def rate_limits(request: Request):
+    token = request.headers.get("X-Admin-Token")
+    if token != CONFIG.ADMIN_TOKEN:
+        return JSONResponse({"detail": "Unauthorized"}, status_code=401)
+    account = request.query_params.get("account")
+    names = [account] if account else sorted(set(CONFIG.ACCOUNTS.keys()) | set(rate_limiter.accounts()))
+    return JSONResponse([rate_limiter.status(n) for n in names])
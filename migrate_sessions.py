@@ -0,0 +1,39 @@
+import argparse
+import glob
+import os
+from app.config import CONFIG
+from app.database import Base, engine
+from app.services.session_store import migrate_file, has_session
+
+
+# Copies Telethon .session files from SESSION_DIR into the tg_sessions /
+# tg_entities tables used when SESSION_STORE=db. The files are only read.
+def main(args):
+    Base.metadata.create_all(bind=engine)
+    base = args.session_dir or CONFIG.SESSION_DIR
+    names = args.session or sorted(
+        os.path.basename(p)[:-len(".session")] for p in glob.glob(os.path.join(base, "*.session"))
+    )
+    for name in names:
+        path = os.path.join(base, name + ".session")
+        if not os.path.isfile(path):
+            print(f"{name}: 找不到 {path}")
+            continue
+        if has_session(name) and not args.overwrite:
+            print(f"{name}: 已存在，跳过（使用 --overwrite 覆盖）")
+            continue
+        try:
+            count = migrate_file(name, path)
+        except Exception as e:
+            print(f"{name}: 迁移失败 {e}")
+            continue
+        print(f"{name}: 已迁移，{count} 个实体")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--session_dir", type=str, default=None)
+    parser.add_argument("--session", type=str, action="append", default=None)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+    main(args)
@@ -95,6 +95,7 @@ async function fetchGroups(forceRefresh = false) {
       const el = document.getElementById('includeChannels');
       if (el) el.checked = true;
       renderGroups();
+      pollMemberCounts(res2);
       return;
     }
   }
@@ -102,6 +103,27 @@ async function fetchGroups(forceRefresh = false) {
   state.filteredGroups = data;
   saveGroupsToCache(data);
   renderGroups();
+  pollMemberCounts(res);
+}
+
+// Member counts are fetched in the background; re-read the (cached) list
+// while the server still reports some as pending.
+async function pollMemberCounts(res, tries = 20) {
+  if (tries <= 0 || !(parseInt(res.headers.get('X-Member-Counts-Pending') || '0') > 0)) return;
+  const account = state.account;
+  const onlyGroups = state.includeChannels ? 'false' : 'true';
+  await new Promise(r => setTimeout(r, 3000));
+  if (account !== state.account) return;
+  const next = await fetch(`/api/groups?only_groups=${onlyGroups}&account=${encodeURIComponent(account || '')}&refresh=false`, {
+    headers: { 'X-Admin-Token': state.token },
+  });
+  if (!next.ok) return;
+  const data = await next.json();
+  if (account !== state.account || onlyGroups !== (state.includeChannels ? 'false' : 'true')) return;
+  state.groups = data;
+  saveGroupsToCache(data);
+  filterGroups();
+  pollMemberCounts(next, tries - 1);
 }
 
 async function fetchAccounts() {
@@ -220,7 +242,14 @@ async function send(path) {
     }, timeoutMs, path === 'send' ? 2 : 3);
     if (!res.ok) {
       if (res.status === 429) {
-        if (resultEl) resultEl.textContent = '请求频率过高或重复，已忽略';
+        const d = await res.json().catch(() => ({}));
+        if (d.detail === 'queue_full') {
+          if (resultEl) resultEl.textContent = `任务队列已满（排队 ${d.depth}），约 ${d.eta_s} 秒后重试`;
+        } else {
+          if (resultEl) resultEl.textContent = '请求频率过高或重复，已忽略';
+        }
+      } else if (res.status === 503) {
+        if (resultEl) resultEl.textContent = '服务启动中，请稍后重试';
       } else if (res.status === 401) {
         if (resultEl) resultEl.textContent = '令牌错误，请在顶部保存令牌';
       } else if (res.status === 403) {
@@ -232,7 +261,7 @@ async function send(path) {
       const data = await res.json();
       if (path === 'send') {
         if (resultEl) resultEl.textContent = `任务已创建(${data.task_id})，正在发送...`;
-        await pollTaskUntilDone(data.task_id, resultEl);
+        await watchTaskUntilDone(data.task_id, resultEl);
       } else {
         if (resultEl) resultEl.textContent = `总数 ${data.total}｜成功 ${data.success}｜失败 ${data.failed}`;
         await fetchLogs();
@@ -247,6 +276,59 @@ async function send(path) {
   }
 }
 
+const FINAL_STATUSES = ['done', 'stopped', 'error'];
+
+function renderTaskStatus(s, resultEl) {
+  const roundInfo = (s.rounds && s.current_round) ? `｜轮次 ${s.current_round}/${s.rounds}` : '';
+  const statusInfo = s.status && s.status !== 'running' && s.status !== 'done' ? `｜${s.status}` : '';
+  if (resultEl) resultEl.textContent = `总数 ${s.total}｜成功 ${s.success}｜失败 ${s.failed}${roundInfo}${statusInfo}`;
+}
+
+// Server-Sent Events over fetch (EventSource cannot send X-Admin-Token).
+// Falls back to polling when the stream cannot be opened or drops early.
+async function watchTaskUntilDone(taskId, resultEl) {
+  const snapshot = { task_id: taskId };
+  try {
+    const res = await fetch(`/api/events?task_id=${encodeURIComponent(taskId)}&logs=1`, { headers: { 'X-Admin-Token': state.token } });
+    if (!res.ok || !res.body) throw new Error('HTTP ' + res.status);
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buf = '';
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, { stream: true });
+      let sep;
+      while ((sep = buf.indexOf('\n\n')) >= 0) {
+        const chunk = buf.slice(0, sep);
+        buf = buf.slice(sep + 2);
+        let event = 'message';
+        let data = '';
+        chunk.split('\n').forEach(line => {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        });
+        if (!data) continue;
+        const ev = JSON.parse(data);
+        if (event === 'snapshot') {
+          Object.assign(snapshot, ev);
+          renderTaskStatus(snapshot, resultEl);
+          if (FINAL_STATUSES.includes(ev.status)) { reader.cancel(); return; }
+        } else if (event === 'target') {
+          Object.assign(snapshot, { total: ev.total, success: ev.success, failed: ev.failed, current_round: ev.round });
+          renderTaskStatus(snapshot, resultEl);
+        } else if (event === 'round') {
+          Object.assign(snapshot, { current_round: ev.round, rounds: ev.rounds });
+          renderTaskStatus(snapshot, resultEl);
+        } else if (event === 'log') {
+          prependLogRow(ev);
+        }
+      }
+    }
+  } catch {}
+  await pollTaskUntilDone(taskId, resultEl);
+}
+
 async function pollTaskUntilDone(taskId, resultEl) {
   return new Promise(async (resolve) => {
     const timer = setInterval(async () => {
@@ -254,9 +336,8 @@ async function pollTaskUntilDone(taskId, resultEl) {
         const res = await fetch(`/api/task-status?task_id=${encodeURIComponent(taskId)}`, { headers: { 'X-Admin-Token': state.token } });
         if (!res.ok) return;
         const s = await res.json();
-        const roundInfo = (s.rounds && s.current_round) ? `｜轮次 ${s.current_round}/${s.rounds}` : '';
-        if (resultEl) resultEl.textContent = `总数 ${s.total}｜成功 ${s.success}｜失败 ${s.failed}${roundInfo}`;
-        if (s.status === 'done') {
+        renderTaskStatus(s, resultEl);
+        if (FINAL_STATUSES.includes(s.status)) {
           clearInterval(timer);
           await fetchLogs();
           resolve();
@@ -266,6 +347,25 @@ async function pollTaskUntilDone(taskId, resultEl) {
   });
 }
 
+function logRowHtml(r) {
+  return `
+      <td>${r.created_at || ''}</td>
+      <td>${r.group_title || r.group_id}</td>
+      <td>${r.status}</td>
+      <td>${r.message_id || ''}</td>
+      <td>${r.error || ''}</td>
+    `;
+}
+
+function prependLogRow(r) {
+  const tbody = document.getElementById('logsBody');
+  if (!tbody) return;
+  const tr = document.createElement('tr');
+  tr.innerHTML = logRowHtml(r);
+  tbody.insertBefore(tr, tbody.firstChild);
+  while (tbody.children.length > 50) tbody.removeChild(tbody.lastChild);
+}
+
 async function fetchLogs() {
   const res = await fetch('/api/logs?limit=50', {
     headers: { 'X-Admin-Token': state.token },
@@ -276,13 +376,7 @@ async function fetchLogs() {
   tbody.innerHTML = '';
   data.forEach(r => {
     const tr = document.createElement('tr');
-    tr.innerHTML = `
-      <td>${r.created_at || ''}</td>
-      <td>${r.group_title || r.group_id}</td>
-      <td>${r.status}</td>
-      <td>${r.message_id || ''}</td>
-      <td>${r.error || ''}</td>
-    `;
+    tr.innerHTML = logRowHtml(r);
     tbody.appendChild(tr);
   });
 }
@@ -0,0 +1,100 @@
+import os
+import sys
+import tempfile
+
+# app.config reads the environment at import time, so point it at a
+# throwaway database and session directory before anything imports app.
+_TMP = tempfile.mkdtemp(prefix="tg-tests-")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ["SESSION_DIR"] = _TMP
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.models  # noqa: E402,F401
+from app.database import Base, engine  # noqa: E402
+
+Base.metadata.create_all(bind=engine)
+
+import uuid  # noqa: E402
+import pytest  # noqa: E402
+from app.database import SessionLocal  # noqa: E402
+from app.models import Task  # noqa: E402
+from app.services import group_titles  # noqa: E402
+from app.services.task_targets import pack_targets  # noqa: E402
+
+
+# Telethon client/account-client/manager stand-ins for code that talks to
+# multi_manager.get(account).client directly (bulk tasks, link previews).
+# Raw requests and delete_messages calls are recorded; set acm.down or
+# client.error to make the connect or the request fail.
+class StubClient:
+    def __init__(self):
+        self.requests = []
+        self.deleted = []
+        self.error = None
+
+    async def __call__(self, request):
+        if self.error is not None:
+            raise self.error
+        self.requests.append(request)
+
+    async def delete_messages(self, entity, ids, revoke=True):
+        self.deleted.append((entity, ids))
+
+
+class StubAcm:
+    def __init__(self):
+        self.client = StubClient()
+        self.down = False
+        self.retry_in_s = 5.0
+
+    async def ensure_connected(self):
+        if self.down:
+            raise ConnectionError("reconnecting in 5s")
+
+
+class StubManager:
+    def __init__(self):
+        self.acm = StubAcm()
+
+    def get(self, account):
+        return self.acm
+
+
+@pytest.fixture
+def stub_manager():
+    return StubManager()
+
+
+@pytest.fixture
+def no_backfill(monkeypatch):
+    monkeypatch.setattr(group_titles, "schedule_backfill", lambda manager, account: None)
+
+
+# Inserts a queued task and returns its id. targets (group ids, or message
+# row ids for bulk kinds) sets targets_blob and total.
+@pytest.fixture
+def make_task():
+    def make(targets: list, **overrides) -> str:
+        values = {
+            "id": uuid.uuid4().hex[:24],
+            "status": "queued",
+            "total": len(targets),
+            "success": 0,
+            "failed": 0,
+            "account_name": "acc",
+            "message": "hello",
+            "parse_mode": "plain",
+            "disable_web_page_preview": 1,
+            "delay_ms": 0,
+            "current_index": 0,
+            "targets_blob": pack_targets(targets),
+            **overrides,
+        }
+        db = SessionLocal()
+        try:
+            db.add(Task(**values))
+            db.commit()
+        finally:
+            db.close()
+        return values["id"]
+    return make
@@ -0,0 +1,47 @@
+import asyncio
+from app.database import SessionLocal, engine
+from app.models import SendLog, Task
+from app.services import send_service, task_runner
+
+
+# Sends must not hold a pooled DB connection while they wait on Telegram:
+# each stub records how many connections are checked out mid-await.
+class _StubManager:
+    def __init__(self):
+        self.checked_out: list[int] = []
+
+    async def send_message_to_group(self, account, group_id, **kwargs):
+        await asyncio.sleep(0)
+        self.checked_out.append(engine.pool.checkedout())
+        await asyncio.sleep(0)
+        return True, None, 1000 + group_id
+
+
+def test_run_task_slice_releases_connection_during_send(monkeypatch, no_backfill, make_task):
+    stub = _StubManager()
+    monkeypatch.setattr(task_runner, "multi_manager", stub)
+    task_id = make_task([11, 12, 13])
+
+    assert asyncio.run(task_runner.run_task_slice(task_id)) is None
+
+    assert stub.checked_out == [0, 0, 0]
+    db = SessionLocal()
+    try:
+        t = db.query(Task).filter(Task.id == task_id).first()
+        assert (t.status, t.success) == ("done", 3)
+    finally:
+        db.close()
+
+
+def test_send_to_groups_releases_connection_during_send(no_backfill):
+    stub = _StubManager()
+
+    resp = asyncio.run(send_service.send_to_groups(stub, "acc-direct", [21, 22], "hi", "plain", True))
+
+    assert resp["success"] == 2
+    assert stub.checked_out == [0, 0]
+    db = SessionLocal()
+    try:
+        assert db.query(SendLog).filter(SendLog.account_name == "acc-direct").count() == 2
+    finally:
+        db.close()
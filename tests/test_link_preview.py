@@ -0,0 +1,28 @@
+import asyncio
+from telethon.errors import FloodWaitError
+from app.services import link_preview
+from app.services.rate_limiter import rate_limiter
+
+
+def _prefetch(manager, account):
+    return asyncio.run(link_preview.prefetch_preview(manager, account, "https://example.com", None))
+
+
+def test_reconnect_and_flood_wait_leave_the_preview_pending(stub_manager):
+    stub_manager.acm.down = True
+    assert _prefetch(stub_manager, "acc-preview") == ("pending", None)
+
+    stub_manager.acm.down = False
+    stub_manager.acm.client.error = FloodWaitError(None, capture=300)
+    try:
+        assert _prefetch(stub_manager, "acc-preview-flood") == ("pending", None)
+        assert rate_limiter.blocked_for("acc-preview-flood") > 200
+    finally:
+        rate_limiter._bucket("acc-preview-flood").blocked_until = 0.0
+
+
+def test_pending_preview_is_polled_a_bounded_number_of_times():
+    due = [link_preview.prefetch_due("task-preview") for _ in range(5)]
+    assert due == [True, True, True, False, False]
+    link_preview.forget("task-preview")
+    assert link_preview.prefetch_due("task-preview")
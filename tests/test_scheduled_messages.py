@@ -0,0 +1,85 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from app.database import SessionLocal
+from app.models import ScheduledMessage, Task
+from app.services import task_runner
+from app.services.rate_limiter import rate_limiter
+
+
+# First scheduled submit hits a flood wait that parks the account (as the
+# real manager does); everything else goes through.
+class _FloodOnceManager:
+    def __init__(self):
+        self.flooded = False
+        self.scheduled = 0
+
+    async def send_message_to_group(self, account, group_id, schedule=None, **kwargs):
+        if schedule is None:
+            return True, None, 1
+        if not self.flooded:
+            self.flooded = True
+            rate_limiter.block(account, 120)
+            return False, "flood_wait:120", None
+        self.scheduled += 1
+        return True, None, 100 + self.scheduled
+
+
+def _statuses(task_id: str) -> list[str]:
+    db = SessionLocal()
+    try:
+        rows = db.query(ScheduledMessage).filter(ScheduledMessage.task_id == task_id).order_by(ScheduledMessage.round).all()
+        return [r.status for r in rows]
+    finally:
+        db.close()
+
+
+def test_rounds_interrupted_by_flood_wait_are_submitted_later(monkeypatch, no_backfill, make_task):
+    stub = _FloodOnceManager()
+    monkeypatch.setattr(task_runner, "multi_manager", stub)
+    task_id = make_task([41], account_name="acc-sched", rounds=3, round_interval_s=60, native_schedule=1)
+
+    # round 1 goes out, round 2's submit hits the flood wait: the task is
+    # not finished and rounds 2..3 wait as pending
+    assert asyncio.run(task_runner.run_task_slice(task_id)) >= 60
+    assert _statuses(task_id) == ["pending", "pending"]
+
+    # the wait is over; the next slice (or a resume) submits them
+    rate_limiter._bucket("acc-sched").blocked_until = 0.0
+    assert asyncio.run(task_runner.run_task_slice(task_id)) is None
+    assert _statuses(task_id) == ["submitted", "submitted"]
+    db = SessionLocal()
+    try:
+        assert db.query(Task).filter(Task.id == task_id).first().status == "done"
+        later = db.query(ScheduledMessage).filter(ScheduledMessage.task_id == task_id).all()
+        assert all(r.schedule_at.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) + timedelta(seconds=20) for r in later)
+    finally:
+        db.close()
+
+
+def test_schedule_cancel_runs_as_a_task_one_call_per_chat(monkeypatch, stub_manager, make_task):
+    from app.services import task_bulk
+    from app.services.task_bulk import scheduled_message_ids
+    monkeypatch.setattr(task_bulk, "multi_manager", stub_manager)
+    source_id = uuid.uuid4().hex[:24]
+    later = datetime.now(timezone.utc) + timedelta(hours=1)
+    db = SessionLocal()
+    try:
+        for gid, round_no in ((51, 2), (51, 3), (52, 2)):
+            db.add(ScheduledMessage(task_id=source_id, account_name="acc-cancel", group_id=gid, round=round_no, message_id=round_no, schedule_at=later, status="submitted"))
+        db.commit()
+    finally:
+        db.close()
+    ids = scheduled_message_ids(source_id)
+    task_id = make_task(ids, kind="schedule_cancel", source_task_id=source_id, account_name="acc-cancel")
+
+    assert asyncio.run(task_runner.run_task_slice(task_id)) is None
+
+    assert [(r.peer, r.id) for r in stub_manager.acm.client.requests] == [(51, [2, 3]), (52, [2])]
+    assert _statuses(source_id) == ["cancelled"] * 3
+    db = SessionLocal()
+    try:
+        t = db.query(Task).filter(Task.id == task_id).first()
+        assert (t.status, t.success) == ("done", 3)
+    finally:
+        db.close()
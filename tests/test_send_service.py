@@ -0,0 +1,46 @@
+import asyncio
+from app.services import send_service
+
+
+class _FlakyManager:
+    async def send_message_to_group(self, account, group_id, **kwargs):
+        if group_id == 32:
+            raise ConnectionError("client_unavailable")
+        if group_id == 33:
+            raise RuntimeError("session_not_authorized")
+        return True, None, 2000 + group_id
+
+
+def test_send_to_groups_reports_per_target_errors(no_backfill):
+    resp = asyncio.run(send_service.send_to_groups(_FlakyManager(), "acc-flaky", [31, 32, 33], "hi", "plain", True))
+
+    assert resp == {"total": 3, "success": 1, "failed": 2}
+
+
+def test_test_send_rejects_blocked_account_and_large_batches(monkeypatch):
+    from starlette.testclient import TestClient
+    import main
+    from app.config import CONFIG
+    from app.services.rate_limiter import rate_limiter
+
+    async def authorized(account):
+        return True
+
+    async def no_send(*args, **kwargs):
+        raise AssertionError("must not send")
+
+    monkeypatch.setattr(main.account_status, "is_authorized", authorized)
+    monkeypatch.setattr(main, "send_to_groups", no_send)
+    client = TestClient(main.app)
+    headers = {"X-Admin-Token": CONFIG.ADMIN_TOKEN}
+
+    r = client.post("/api/test-send", headers=headers, json={"account": "acc-test-send", "group_ids": list(range(11)), "message": "hi"})
+    assert r.status_code == 400 and r.json()["use"] == "/api/send"
+
+    main._LAST_TS.clear()  # the per-token throttle would answer 429 first
+    rate_limiter.block("acc-test-send", 3600)
+    try:
+        r = client.post("/api/test-send", headers=headers, json={"account": "acc-test-send", "group_ids": [1], "message": "hi"})
+    finally:
+        rate_limiter._bucket("acc-test-send").blocked_until = 0.0
+    assert r.status_code == 429 and int(r.headers["Retry-After"]) > 3000
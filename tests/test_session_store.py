@@ -0,0 +1,19 @@
+import asyncio
+from telethon.tl.types import InputPeerUser, User
+from app.services.session_store import DbSession
+
+
+def test_process_entities_drops_removed_username_keeps_it_for_bare_peers():
+    async def scenario():
+        s = DbSession("acc-entities", load=False)
+        s.process_entities([User(id=7, access_hash=1, username="Old", first_name="Ann")])
+        # a bare InputPeer says nothing about the username or name
+        s.process_entities([InputPeerUser(7, 2)])
+        bare = s._by_id[7]
+        # a full entity without them means they were removed
+        s.process_entities([User(id=7, access_hash=3, first_name="Ann")])
+        return bare, s._by_id[7]
+
+    bare, full = asyncio.run(scenario())
+    assert bare == (7, 2, "old", None, "Ann")
+    assert full == (7, 3, None, None, "Ann")
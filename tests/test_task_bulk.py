@@ -0,0 +1,58 @@
+import asyncio
+import uuid
+from app.database import SessionLocal
+from app.models import SendLog, Task
+from app.services import task_bulk, task_runner
+
+
+def _delete_task(make_task, source_id: str, sends) -> str:
+    db = SessionLocal()
+    try:
+        for gid, msg_id in sends:
+            db.add(SendLog(task_id=source_id, account_name="acc-bulk", group_id=gid, status="success", message_id=msg_id))
+        db.add(SendLog(task_id=source_id, account_name="acc-bulk", group_id=63, status="failed"))
+        db.commit()
+    finally:
+        db.close()
+    ids = task_bulk.sent_message_log_ids(source_id)
+    return make_task(ids, kind="delete", source_task_id=source_id, account_name="acc-bulk")
+
+
+def test_bulk_delete_keeps_the_send_result(monkeypatch, stub_manager, make_task):
+    monkeypatch.setattr(task_bulk, "multi_manager", stub_manager)
+    source_id = uuid.uuid4().hex[:24]
+    task_id = _delete_task(make_task, source_id, ((61, 1), (61, 2), (62, 3)))
+
+    assert asyncio.run(task_runner.run_task_slice(task_id)) is None
+
+    assert stub_manager.acm.client.deleted == [(61, [1, 2]), (62, [3])]
+    db = SessionLocal()
+    try:
+        rows = db.query(SendLog).filter(SendLog.task_id == source_id).order_by(SendLog.id).all()
+        assert [(r.status, r.followup) for r in rows] == [
+            ("success", "deleted"), ("success", "deleted"), ("success", "deleted"), ("failed", None),
+        ]
+    finally:
+        db.close()
+    assert task_bulk.sent_message_log_ids(source_id) == []
+
+
+def test_bulk_delete_retries_while_reconnecting(monkeypatch, stub_manager, make_task):
+    stub_manager.acm.down = True
+    monkeypatch.setattr(task_bulk, "multi_manager", stub_manager)
+    source_id = uuid.uuid4().hex[:24]
+    task_id = _delete_task(make_task, source_id, ((64, 1), (65, 2)))
+
+    assert asyncio.run(task_runner.run_task_slice(task_id)) == 5.0
+    db = SessionLocal()
+    try:
+        t = db.query(Task).filter(Task.id == task_id).first()
+        assert (t.status, t.success, t.failed) == ("running", 0, 0)
+    finally:
+        db.close()
+
+    # back up: the same messages are deleted on the next slice
+    stub_manager.acm.down = False
+    assert asyncio.run(task_runner.run_task_slice(task_id)) is None
+    assert stub_manager.acm.client.deleted == [(64, [1]), (65, [2])]
+    assert task_bulk.sent_message_log_ids(source_id) == []
@@ -0,0 +1,40 @@
+import asyncio
+from sqlalchemy import event
+from app.config import CONFIG
+from app.database import SessionLocal, engine
+from app.models import SendLog
+from app.services import task_runner
+
+
+class _StubManager:
+    async def send_message_to_group(self, account, group_id, **kwargs):
+        return True, None, 3000 + group_id
+
+
+# Default pacing scaled down 100x: sends every SEND_MIN_DELAY_MS, flush
+# window TASK_FLUSH_INTERVAL_MS. The window must cover several sends.
+def test_paced_sends_share_commits(monkeypatch, no_backfill, make_task):
+    monkeypatch.setattr(task_runner, "multi_manager", _StubManager())
+    monkeypatch.setattr(CONFIG, "TASK_FLUSH_INTERVAL_MS", CONFIG.TASK_FLUSH_INTERVAL_MS // 100)
+    assert CONFIG.TASK_FLUSH_INTERVAL_MS > CONFIG.SEND_MIN_DELAY_MS // 100
+    task_id = make_task([41, 42, 43, 44], account_name="acc-writer", delay_ms=CONFIG.SEND_MIN_DELAY_MS // 100)
+
+    log_inserts = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO send_logs"):
+            log_inserts.append(len(parameters) if executemany else 1)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        assert asyncio.run(task_runner.run_task_slice(task_id)) is None
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert sum(log_inserts) == 4
+    assert len(log_inserts) < 4
+    db = SessionLocal()
+    try:
+        assert db.query(SendLog).filter(SendLog.task_id == task_id).count() == 4
+    finally:
+        db.close()
@@ -0,0 +1,50 @@
+import asyncio
+from app.telegram_client import AccountClientManager, DISCONNECTED
+
+
+class _SlowClient:
+    def __init__(self, release: asyncio.Event):
+        self.release = release
+        self.up = False
+        self.disconnects = 0
+        self.disconnected = asyncio.get_running_loop().create_future()
+
+    async def connect(self):
+        await self.release.wait()
+        self.up = True
+
+    async def is_user_authorized(self):
+        return True
+
+    def is_connected(self):
+        return self.up
+
+    async def disconnect(self):
+        self.disconnects += 1
+        self.up = False
+        if not self.disconnected.done():
+            self.disconnected.set_result(None)
+
+
+def test_close_waits_for_a_connect_in_progress(monkeypatch):
+    async def scenario():
+        release = asyncio.Event()
+        acm = AccountClientManager("s", 1, "h", account="acc-close")
+        client = _SlowClient(release)
+        monkeypatch.setattr(acm, "_new_client", lambda: client)
+        connecting = asyncio.create_task(acm.ensure_connected())
+        await asyncio.sleep(0)
+        closing = asyncio.create_task(acm.close())
+        await asyncio.sleep(0)
+        # close must not drop the client while connect() is still using it
+        assert acm.client is client and not closing.done()
+        release.set()
+        await connecting
+        await closing
+        return acm, client
+
+    acm, client = asyncio.run(scenario())
+    assert acm.client is None
+    assert acm.state == DISCONNECTED
+    assert acm._watcher is None
+    assert client.disconnects == 1